@@ -0,0 +1,134 @@
+"""Чтение лент с реплик, запись и все остальное -- в основную базу.
+
+Реплики перечислены в DATABASE_REPLICAS: это алиасы DATABASES, например
+локальные копии файла SQLite, которые обновляет manage.py refresh_replicas.
+С реплики читают только view под replica_reads, и только пока запрос
+ничего не записал: после первой записи чтение до конца запроса идет
+в основную базу. ReplicaPinMiddleware ставит писавшему пользователю
+куку, и еще REPLICA_PIN_SECONDS секунд все его запросы читают основную
+базу -- автор сразу видит свой пост, даже если реплика отстает.
+"""
+import os
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Сессии читаются только из основной базы: вход и выход должны
+# действовать сразу, а не после обновления реплики.
+PRIMARY_APPS = {'sessions'}
+
+_state = threading.local()
+
+
+def is_replica(alias):
+    return alias in settings.DATABASE_REPLICAS
+
+
+def current_replica():
+    """Реплика, с которой сейчас читает поток, или None."""
+    if getattr(_state, 'pinned', True) or getattr(_state, 'primary', 0):
+        return None
+    return _state.replica
+
+
+def replica_stamp():
+    """Время обновления читаемой реплики (mtime ее файла) или None.
+
+    Входит в ETag и Last-Modified: страница, собранная с отстающей
+    реплики, перестает совпадать с кешем клиента, когда реплику обновят.
+    """
+    alias = current_replica()
+    if alias is None:
+        return None
+    try:
+        return os.path.getmtime(connections[alias].settings_dict['NAME'])
+    except (OSError, TypeError):
+        return None
+
+
+def pin_primary():
+    """Отмечает запись в базу: дальше запрос читает основную базу,
+    а пользователь получит куку. Роутер вызывает ее сам; вручную --
+    если запись прошла в другом потоке."""
+    _state.pinned = True
+    _state.wrote = True
+
+
+@contextmanager
+def primary():
+    """Внутри блока все чтение идет в основную базу."""
+    _state.primary = getattr(_state, 'primary', 0) + 1
+    try:
+        yield
+    finally:
+        _state.primary -= 1
+
+
+def replica_reads(view):
+    """Разрешает view читать со случайной реплики.
+
+    Только для GET и HEAD и только если у пользователя нет куки
+    недавней записи.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (not settings.DATABASE_REPLICAS
+                or request.method not in ('GET', 'HEAD')
+                or settings.REPLICA_PIN_COOKIE in request.COOKIES
+                or not getattr(_state, 'pinned', True)):
+            return view(request, *args, **kwargs)
+        _state.replica = random.choice(settings.DATABASE_REPLICAS)
+        _state.pinned = False
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.replica = None
+            _state.pinned = True
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return DEFAULT_DB_ALIAS
+        return current_replica() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        pin_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики -- копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return not is_replica(db)
+
+
+class ReplicaPinMiddleware:
+    """Ставит куку REPLICA_PIN_COOKIE на REPLICA_PIN_SECONDS после
+    запроса, который писал в базу. Работает, только если есть реплики."""
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            _state.wrote = False
+        if wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,120 @@
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Реестр источников метрик для эндпоинта /metrics/ в текстовом формате
+# Prometheus. Источник -- функция без аргументов, отдающая строки.
+_collectors = []
+
+
+def register(collector):
+    _collectors.append(collector)
+    return collector
+
+
+def render():
+    lines = []
+    for collector in _collectors:
+        lines.extend(collector())
+    return '\n'.join(lines) + '\n'
+
+
+class Histogram:
+    """Гистограмма Prometheus с метками, общая для всех воркеров.
+
+    Наблюдения копятся в процессе и раз в METRICS_FLUSH_INTERVAL секунд
+    прибавляются к счетчикам в кеше по умолчанию (incr), как счетчики
+    page_cache. /metrics/ любого воркера отдает сумму по всем процессам,
+    и счетчики не сбрасываются при перезапуске одного из них. Сумма
+    хранится в микросекундах: incr работает только с целыми.
+    """
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+    def __init__(self, name, help_text, label, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._pending = {}
+        # Все метки, которые видел процесс.
+        self._seen = set()
+        self._flushed = time.monotonic()
+        register(self.collect)
+
+    def observe(self, label_value, value):
+        with self._lock:
+            series = self._pending.get(label_value)
+            if series is None:
+                series = self._pending[label_value] = {
+                    'buckets': [0] * len(self.buckets), 'sum': 0, 'count': 0}
+            series['sum'] += round(value * 1e6)
+            series['count'] += 1
+            position = bisect.bisect_left(self.buckets, value)
+            if position < len(self.buckets):
+                series['buckets'][position] += 1
+            flush = (time.monotonic() - self._flushed
+                     > settings.METRICS_FLUSH_INTERVAL)
+        if flush:
+            self.flush()
+
+    def keys(self, label_value):
+        prefix = f'metrics:{self.name}:{label_value}'
+        return {
+            'buckets': [f'{prefix}:bucket:{bound}' for bound in self.buckets],
+            'sum': f'{prefix}:sum',
+            'count': f'{prefix}:count',
+        }
+
+    def flush(self):
+        """Прибавляет накопленное в процессе к общим счетчикам."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed = time.monotonic()
+        if not pending:
+            return
+        labels_key = f'metrics:{self.name}:labels'
+        labels = cache.get(labels_key) or []
+        self._seen.update(pending)
+        if not self._seen.issubset(labels):
+            # Метку, потерянную при одновременной записи двух воркеров,
+            # вернет следующий сброс любого, кто ее видел.
+            cache.set(labels_key, sorted({*labels, *self._seen}), None)
+        for label_value, data in pending.items():
+            keys = self.keys(label_value)
+            deltas = zip([*keys['buckets'], keys['sum'], keys['count']],
+                         [*data['buckets'], data['sum'], data['count']])
+            for key, delta in deltas:
+                if not delta:
+                    continue
+                cache.add(key, 0, None)
+                try:
+                    cache.incr(key, delta)
+                except ValueError:
+                    # Счетчик вытеснили между add и incr.
+                    pass
+
+    def collect(self):
+        self.flush()
+        labels = cache.get(f'metrics:{self.name}:labels') or []
+        keys = {label_value: self.keys(label_value) for label_value in labels}
+        values = cache.get_many([
+            key for series in keys.values()
+            for key in [*series['buckets'], series['sum'], series['count']]])
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} histogram'
+        for label_value, series in sorted(keys.items()):
+            label = f'{self.label}="{label_value}"'
+            count = values.get(series['count'], 0)
+            cumulative = 0
+            for bound, key in zip(self.buckets, series['buckets']):
+                cumulative += values.get(key, 0)
+                yield (f'{self.name}_bucket{{{label},le="{bound}"}} '
+                       f'{cumulative}')
+            yield f'{self.name}_bucket{{{label},le="+Inf"}} {count}'
+            yield (f'{self.name}_sum{{{label}}} '
+                   f'{values.get(series["sum"], 0) / 1e6}')
+            yield f'{self.name}_count{{{label}}} {count}'
@@ -0,0 +1,114 @@
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+from . import metrics
+from .sql_fingerprints import QueryRecorder
+
+REQUEST_DURATION = metrics.Histogram(
+    'yatube_request_duration_seconds',
+    'Time spent in the view, by URL name.', 'view')
+DB_DURATION = metrics.Histogram(
+    'yatube_request_db_seconds',
+    'Time spent in SQL queries per request, by URL name.', 'view')
+TEMPLATE_DURATION = metrics.Histogram(
+    'yatube_request_template_seconds',
+    'Time spent rendering templates per request, by URL name.', 'view')
+
+_local = threading.local()
+
+
+class RequestTimings:
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.template_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db += time.perf_counter() - started
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        timings = getattr(_local, 'timings', None)
+        if timings is None:
+            return render(self, context)
+        # Вложенные include считаются внутри внешнего шаблона.
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timings.template_depth -= 1
+            if not timings.template_depth:
+                timings.template += time.perf_counter() - started
+    wrapper.timed = True
+    return wrapper
+
+
+class PerformanceMiddleware:
+    """Число и время SQL-запросов, время шаблонов и всего view.
+
+    Пишет их в заголовок Server-Timing и в гистограммы по имени URL,
+    которые отдает /metrics/. Включается PERFORMANCE_METRICS_ENABLED.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        if not getattr(Template.render, 'timed', False):
+            Template.render = _timed_render(Template.render)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = _local.timings = RequestTimings()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings))
+                response = self.get_response(request)
+        finally:
+            _local.timings = None
+        total = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        REQUEST_DURATION.observe(view, total)
+        DB_DURATION.observe(view, timings.db)
+        TEMPLATE_DURATION.observe(view, timings.template)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={timings.db * 1000:.1f};'
+            f'desc="{timings.queries} queries"',
+            f'tpl;dur={timings.template * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+        return response
+
+
+class SqlFingerprintMiddleware:
+    """Собирает статистику SQL по отпечаткам и пишет медленные запросы
+    в лог yatube.slow_queries. Включается SQL_FINGERPRINTS_ENABLED."""
+
+    def __init__(self, get_response):
+        if not settings.SQL_FINGERPRINTS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            return self.get_response(request)
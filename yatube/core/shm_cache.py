@@ -0,0 +1,384 @@
+"""Кеш в разделяемой памяти: один файл mmap на все процессы хоста.
+
+Файл LOCATION (лучше на tmpfs, например в /dev/shm) разбит на MAX_ENTRIES
+слотов одного размера SLOT_SIZE. Слоты сгруппированы в наборы по WAYS
+штук: ключ по хешу попадает в один набор и ищется только в нем.
+Вытеснение внутри набора -- clock: попадание ставит слоту бит обращения,
+стрелка набора сбрасывает биты и занимает первый слот без бита.
+
+Запись идет под блокировкой полосы наборов: fcntl-блокировка байта
+файла между процессами и threading.Lock внутри процесса (fcntl-
+блокировки принадлежат процессу, а не потоку). На x86 чтение идет без
+блокировок, по seqlock: писатель держит счетчик слота нечетным на время
+записи, читатель повторяет чтение, если счетчик был нечетным или
+изменился. Это верно только при порядке памяти x86, поэтому на других
+архитектурах чтение берет блокировку полосы.
+
+pickle длиннее COMPRESS_MIN сжимается zlib. Значения, которые и после
+сжатия не помещаются в слот, не кешируются. Размеры из OPTIONS входят
+в имя файла: воркеры с другими размерами (например, при постепенном
+перезапуске) работают со своим файлом и не трогают чужой. Файлы старых
+размеров можно удалить, когда остановятся все их процессы.
+"""
+import fcntl
+import mmap
+import os
+import pickle
+import platform
+import struct
+import threading
+import time
+import zlib
+from contextlib import ExitStack, contextmanager
+from hashlib import blake2b
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+MAGIC = b'YTSHM001'
+# magic, размер слота, наборов, слотов в наборе, полос блокировок.
+HEADER = struct.Struct('<8sIIII')
+# seq, хеш ключа (0 -- пустой слот), срок (0 -- бессрочно), длина
+# значения, длина ключа, бит обращения, флаги.
+SLOT = struct.Struct('<QQdIHBB')
+SEQ = struct.Struct('<Q')
+REF_OFFSET = 30
+COMPRESSED = 1
+COMPRESS_MIN = 1024
+# Попыток прочитать слот без блокировки, прежде чем взять ее.
+READ_RETRIES = 8
+# seqlock без барьеров памяти верен только на x86.
+LOCK_FREE_READS = platform.machine().lower() in {
+    'x86_64', 'amd64', 'i386', 'i686', 'x86'}
+
+_MISSING = object()
+
+
+def key_hash(key):
+    # hash() строк в Python свой в каждом процессе.
+    return int.from_bytes(blake2b(key, digest_size=8).digest(),
+                          'little') or 1
+
+
+def align(size, to=64):
+    return (size + to - 1) // to * to
+
+
+def same_file(fd, path):
+    try:
+        return os.path.samestat(os.fstat(fd), os.stat(path))
+    except FileNotFoundError:
+        return False
+
+
+class Region:
+    """Отображенный файл кеша и блокировки полос в одном процессе."""
+
+    def __init__(self, path, slot_size, sets, ways, stripes):
+        self.slot_size = slot_size
+        self.sets = sets
+        self.ways = ways
+        self.stripes = stripes
+        self.hands_offset = align(HEADER.size)
+        self.slots_offset = align(self.hands_offset + sets)
+        size = self.slots_offset + sets * ways * slot_size
+        header = HEADER.pack(MAGIC, slot_size, sets, ways, stripes)
+
+        self.path = f'{path}-{slot_size}-{sets}x{ways}-{stripes}'
+        self.fd = self.open(self.path, size, header)
+        self.memory = mmap.mmap(self.fd, size)
+        self.locks = [threading.Lock() for _ in range(stripes)]
+
+    @staticmethod
+    def open(path, size, header):
+        """Дескриптор файла кеша размера size с заголовком header.
+
+        Файл, который уже отображен другими процессами, не обрезается:
+        это дало бы им SIGBUS. Файл чужого формата заменяется новым
+        через rename, старые отображения остаются целыми.
+        """
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX)
+                if not same_file(fd, path):
+                    # Файл заменили, пока ждали блокировку.
+                    os.close(fd)
+                    continue
+                current = os.fstat(fd).st_size
+                if current == 0:
+                    # Новый файл: нули -- пустые слоты.
+                    os.ftruncate(fd, size)
+                    os.pwrite(fd, header, 0)
+                elif (current != size
+                        or os.pread(fd, HEADER.size, 0) != header):
+                    replacement = f'{path}.{os.getpid()}.new'
+                    new_fd = os.open(
+                        replacement, os.O_RDWR | os.O_CREAT | os.O_TRUNC,
+                        0o600)
+                    os.ftruncate(new_fd, size)
+                    os.pwrite(new_fd, header, 0)
+                    os.replace(replacement, path)
+                    fd, new_fd = new_fd, fd
+                    # Закрытие снимает и блокировку старого файла.
+                    os.close(new_fd)
+                    return fd
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+                return fd
+            except BaseException:
+                os.close(fd)
+                raise
+
+    @contextmanager
+    def locked(self, stripe):
+        with self.locks[stripe]:
+            fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, stripe)
+
+    def slot_offset(self, set_index, way):
+        return (self.slots_offset
+                + (set_index * self.ways + way) * self.slot_size)
+
+    def read_slot(self, offset, hashed, key):
+        """(значение, срок, флаги), если в слоте живой key, иначе None;
+        _MISSING, если слот менялся во время чтения."""
+        memory = self.memory
+        seq, slot_hash, expires, value_length, key_length, _, flags = (
+            SLOT.unpack_from(memory, offset))
+        if seq & 1 or key_length + value_length > (
+                self.slot_size - SLOT.size):
+            return _MISSING
+        if slot_hash != hashed:
+            return None
+        start = offset + SLOT.size
+        stored_key = memory[start:start + key_length]
+        value = memory[start + key_length:
+                       start + key_length + value_length]
+        if SEQ.unpack_from(memory, offset)[0] != seq:
+            return _MISSING
+        if stored_key != key or (expires and expires <= time.time()):
+            return None
+        return value, expires, flags
+
+    def find(self, set_index, hashed, key):
+        """Смещение слота с key и его содержимое; вызывать под
+        блокировкой полосы."""
+        for way in range(self.ways):
+            offset = self.slot_offset(set_index, way)
+            found = self.read_slot(offset, hashed, key)
+            if found is _MISSING:
+                # Под блокировкой слот меняться не может: писатель упал
+                # посреди записи. Слот освобождается.
+                self.write(offset)
+            elif found is not None:
+                return offset, found
+        return None, None
+
+    def victim(self, set_index):
+        """Слот под новую запись: пустой, истекший или по clock."""
+        now = time.time()
+        memory = self.memory
+        for way in range(self.ways):
+            offset = self.slot_offset(set_index, way)
+            _, slot_hash, expires = SLOT.unpack_from(memory, offset)[:3]
+            if not slot_hash or (expires and expires <= now):
+                return offset
+        hand_offset = self.hands_offset + set_index
+        hand = memory[hand_offset]
+        while True:
+            offset = self.slot_offset(set_index, hand)
+            hand = (hand + 1) % self.ways
+            if memory[offset + REF_OFFSET]:
+                memory[offset + REF_OFFSET] = 0
+            else:
+                memory[hand_offset] = hand
+                return offset
+
+    def write(self, offset, hashed=0, key=b'', value=b'', expires=0.0,
+              flags=0):
+        memory = self.memory
+        seq = SEQ.unpack_from(memory, offset)[0]
+        seq += seq & 1
+        SEQ.pack_into(memory, offset, seq + 1)
+        SLOT.pack_into(memory, offset, seq + 1, hashed, expires, len(value),
+                       len(key), 0, flags)
+        start = offset + SLOT.size
+        memory[start:start + len(key)] = key
+        memory[start + len(key):start + len(key) + len(value)] = value
+        SEQ.pack_into(memory, offset, seq + 2)
+
+
+_regions = {}
+_regions_lock = threading.Lock()
+
+
+class SharedMemoryCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._slot_size = options.get('SLOT_SIZE', 16384)
+        self._ways = options.get('WAYS', 8)
+        self._stripes = options.get('STRIPES', 64)
+        self._sets = max(1, -(-self._max_entries // self._ways))
+
+    @property
+    def _region(self):
+        # После fork нужны свои блокировки потоков и свой дескриптор.
+        region_key = (self._path, self._slot_size, self._sets, self._ways,
+                      self._stripes, os.getpid())
+        region = _regions.get(region_key)
+        if region is None:
+            with _regions_lock:
+                region = _regions.get(region_key)
+                if region is None:
+                    region = _regions[region_key] = Region(
+                        self._path, self._slot_size, self._sets,
+                        self._ways, self._stripes)
+        return region
+
+    def _locate(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        key = key.encode()
+        hashed = key_hash(key)
+        set_index = hashed % self._sets
+        return key, hashed, set_index, set_index % self._stripes
+
+    @staticmethod
+    def _decode(found):
+        value, _, flags = found
+        if flags & COMPRESSED:
+            value = zlib.decompress(value)
+        return pickle.loads(value)
+
+    @staticmethod
+    def _encode(value):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(pickled) >= COMPRESS_MIN:
+            return zlib.compress(pickled), COMPRESSED
+        return pickled, 0
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return 0.0 if expires is None else expires
+
+    def get(self, key, default=None, version=None):
+        key, hashed, set_index, stripe = self._locate(key, version)
+        region = self._region
+        for _ in range(READ_RETRIES if LOCK_FREE_READS else 0):
+            retry = False
+            for way in range(region.ways):
+                offset = region.slot_offset(set_index, way)
+                found = region.read_slot(offset, hashed, key)
+                if found is _MISSING:
+                    retry = True
+                elif found is not None:
+                    region.memory[offset + REF_OFFSET] = 1
+                    return self._decode(found)
+            if not retry:
+                return default
+        with region.locked(stripe):
+            offset, found = region.find(set_index, hashed, key)
+            if found is None:
+                return default
+            region.memory[offset + REF_OFFSET] = 1
+        return self._decode(found)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        for key in keys:
+            value = self.get(key, _MISSING, version)
+            if value is not _MISSING:
+                found[key] = value
+        return found
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version) is not _MISSING
+
+    def _store(self, region, set_index, hashed, key, value, expires,
+               offset=None):
+        encoded, flags = self._encode(value)
+        if SLOT.size + len(key) + len(encoded) > region.slot_size:
+            # Не помещается: старое значение ключа тоже убираем.
+            if offset is not None:
+                region.write(offset)
+            return False
+        if offset is None:
+            offset = region.victim(set_index)
+        region.write(offset, hashed, key, encoded, expires, flags)
+        return True
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key, hashed, set_index, stripe = self._locate(key, version)
+        expires = self._expires(timeout)
+        region = self._region
+        with region.locked(stripe):
+            offset, _ = region.find(set_index, hashed, key)
+            if expires and expires <= time.time():
+                if offset is not None:
+                    region.write(offset)
+                return
+            self._store(region, set_index, hashed, key, value, expires,
+                        offset)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        for key, value in data.items():
+            self.set(key, value, timeout, version)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key, hashed, set_index, stripe = self._locate(key, version)
+        region = self._region
+        with region.locked(stripe):
+            offset, _ = region.find(set_index, hashed, key)
+            if offset is not None:
+                return False
+            return self._store(region, set_index, hashed, key, value,
+                               self._expires(timeout))
+
+    def incr(self, key, delta=1, version=None):
+        stored_key = key
+        key, hashed, set_index, stripe = self._locate(key, version)
+        region = self._region
+        with region.locked(stripe):
+            offset, found = region.find(set_index, hashed, key)
+            if found is None:
+                raise ValueError("Key '%s' not found" % stored_key)
+            value = self._decode(found) + delta
+            self._store(region, set_index, hashed, key, value, found[1],
+                        offset)
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key, hashed, set_index, stripe = self._locate(key, version)
+        region = self._region
+        with region.locked(stripe):
+            offset, found = region.find(set_index, hashed, key)
+            if found is None:
+                return False
+            value, _, flags = found
+            region.write(offset, hashed, key, value,
+                         self._expires(timeout), flags)
+        return True
+
+    def delete(self, key, version=None):
+        key, hashed, set_index, stripe = self._locate(key, version)
+        region = self._region
+        with region.locked(stripe):
+            offset, _ = region.find(set_index, hashed, key)
+            if offset is not None:
+                region.write(offset)
+
+    def clear(self):
+        region = self._region
+        with ExitStack() as stack:
+            for stripe in range(region.stripes):
+                stack.enter_context(region.locked(stripe))
+            for set_index in range(region.sets):
+                for way in range(region.ways):
+                    offset = region.slot_offset(set_index, way)
+                    if SLOT.unpack_from(region.memory, offset)[1]:
+                        region.write(offset)
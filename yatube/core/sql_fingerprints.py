@@ -0,0 +1,178 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger('yatube.slow_queries')
+
+_LITERALS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def fingerprint(sql):
+    """SQL без литералов: числа, строки и параметры заменены на ?,
+    списки IN (?, ?, ...) свернуты в (...)."""
+    for pattern, replacement in _LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+# Файлы обработчиков execute_wrapper: сами они запросов не делают.
+_INSTRUMENTATION = {
+    os.path.abspath(__file__),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'middleware.py'),
+}
+
+
+def query_origin():
+    """Ближайший к запросу кадр стека из кода проекта (не Django)."""
+    for frame in reversed(traceback.extract_stack()):
+        path = os.path.abspath(frame.filename)
+        if (path.startswith(settings.BASE_DIR)
+                and 'site-packages' not in path
+                and path not in _INSTRUMENTATION):
+            return f'{os.path.relpath(path, settings.BASE_DIR)}:{frame.lineno}'
+    return 'unknown'
+
+
+class FingerprintStats:
+    """Скользящая статистика запросов по паре (отпечаток, view).
+
+    Хранит число и суммарное время запросов и последние SAMPLES значений
+    для перцентилей. Если задан SQL_STATS_DIR, периодически сбрасывается
+    в SQL_STATS_DIR/<pid>.json, откуда ее собирает команда top_queries.
+    Файлы завершившихся процессов при этом удаляются.
+    """
+    SAMPLES = 200
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._flushed = time.monotonic()
+
+    def record(self, sql, view, duration):
+        key = (fingerprint(sql), view)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = {
+                    'count': 0, 'total': 0.0,
+                    'samples': deque(maxlen=self.SAMPLES)}
+            entry['count'] += 1
+            entry['total'] += duration
+            entry['samples'].append(duration)
+            flush = (time.monotonic() - self._flushed
+                     > settings.SQL_STATS_FLUSH_INTERVAL)
+            if flush:
+                self._flushed = time.monotonic()
+        if flush:
+            self.flush()
+
+    def snapshot(self):
+        with self._lock:
+            return [{
+                'fingerprint': sql, 'view': view, 'count': entry['count'],
+                'total': entry['total'], 'samples': list(entry['samples']),
+            } for (sql, view), entry in self._stats.items()]
+
+    def flush(self):
+        directory = settings.SQL_STATS_DIR
+        if not directory:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as stats_file:
+            json.dump(self.snapshot(), stats_file)
+        os.replace(path + '.tmp', path)
+        prune_dead(directory)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+stats = FingerprintStats()
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def prune_dead(directory):
+    """Удаляет файлы статистики завершившихся процессов."""
+    for name in os.listdir(directory):
+        pid = name.split('.', 1)[0]
+        if pid.isdigit() and not pid_alive(int(pid)):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+class QueryRecorder:
+    """execute_wrapper: пишет запрос в статистику и медленный лог."""
+
+    def __init__(self, request):
+        self.request = request
+
+    def view_name(self):
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match else 'unresolved'
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            view = self.view_name()
+            stats.record(sql, view, duration)
+            if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+                logger.warning(
+                    'Slow query %.1f ms in %s at %s: %s',
+                    duration * 1000, view, query_origin(), fingerprint(sql))
+
+
+def load_stats(directory):
+    """Сводит статистику всех процессов из SQL_STATS_DIR."""
+    merged = {}
+    if not directory or not os.path.isdir(directory):
+        return []
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(directory, name)) as stats_file:
+            for entry in json.load(stats_file):
+                key = (entry['fingerprint'], entry['view'])
+                total = merged.setdefault(key, {
+                    'fingerprint': entry['fingerprint'],
+                    'view': entry['view'],
+                    'count': 0, 'total': 0.0, 'samples': []})
+                total['count'] += entry['count']
+                total['total'] += entry['total']
+                total['samples'].extend(entry['samples'])
+    return list(merged.values())
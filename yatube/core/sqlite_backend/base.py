@@ -0,0 +1,85 @@
+"""SQLite для продакшена: WAL, прагмы, проверка постоянных соединений.
+
+Подключается через DATABASES['default']['ENGINE'] = 'core.sqlite_backend'.
+Прагмы берутся из SQLITE_PRAGMAS (или из ключа PRAGMAS алиаса) и ставятся
+на каждое новое соединение с файловой базой (для баз в памяти WAL и mmap
+не имеют смысла). Таймаут ожидания блокировки задается OPTIONS['timeout'].
+"""
+import os
+import sqlite3
+
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+def file_id(path):
+    """Устройство и inode файла базы: меняются, если файл подменили."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    file_id = None
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        if not self.is_in_memory_db():
+            pragmas = self.settings_dict.get('PRAGMAS',
+                                             settings.SQLITE_PRAGMAS)
+            for name, value in pragmas.items():
+                connection.execute(f'PRAGMA {name} = {value}')
+            self.file_id = file_id(self.settings_dict['NAME'])
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        # В WAL отложенная транзакция, начавшая с чтения, не ждет
+        # писателя, а сразу падает с "database is locked" при первой
+        # записи. IMMEDIATE берет блокировку записи сразу и ждет ее
+        # в пределах таймаута.
+        self.cursor().execute('BEGIN IMMEDIATE')
+
+    def is_usable(self):
+        if self.is_in_memory_db():
+            return True
+        if self.file_id != file_id(self.settings_dict['NAME']):
+            # Файл базы удалили или заменили (например, восстановили
+            # из копии) -- старое соединение читает уже не ту базу.
+            return False
+        try:
+            self.connection.execute('SELECT 1')
+        except sqlite3.Error:
+            return False
+        return True
+
+    def close_if_unusable_or_obsolete(self):
+        """Как в Django, плюс проверка живого постоянного соединения
+        в начале и конце каждого запроса."""
+        super().close_if_unusable_or_obsolete()
+        if (self.connection is not None and not self.in_atomic_block
+                and settings.DATABASE_HEALTH_CHECKS
+                and not self.is_usable()):
+            self.close()
+
+    def backup_to(self, path):
+        """Целостная копия базы в файл path для реплики.
+
+        Копия пишется во временный файл рядом и подменяет path одним
+        rename: читатели видят либо старую копию, либо новую, а их
+        соединения со старой закроет проверка is_usable(). Копия
+        в режиме журнала DELETE -- у подменяемого файла не должно
+        оставаться -wal и -shm от прошлой копии.
+        """
+        self.ensure_connection()
+        temporary = f'{path}.tmp'
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        target = sqlite3.connect(temporary)
+        try:
+            self.connection.backup(target)
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+        os.replace(temporary, path)
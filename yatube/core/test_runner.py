@@ -0,0 +1,47 @@
+"""Раннер тестов: файловые кеши прогона -- во временном каталоге.
+
+Иначе cache.clear() в тестах очищал бы кеш сервера, запущенного на той
+же машине, а содержимое кеша переживало бы прогон.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+# Бэкенды, у которых LOCATION -- путь к файлу.
+FILE_BACKENDS = {
+    'core.tiered_cache.TieredCache',
+    'core.shm_cache.SharedMemoryCache',
+}
+
+
+@contextmanager
+def isolated_caches(prefix='yatube-cache-'):
+    """Файловые кеши внутри блока пишут во временный каталог; после
+    блока возвращаются прежние, каталог удаляется."""
+    directory = tempfile.mkdtemp(prefix=prefix)
+    caches = {
+        alias: (dict(config, LOCATION=os.path.join(directory, alias))
+                if config['BACKEND'] in FILE_BACKENDS else config)
+        for alias, config in settings.CACHES.items()
+    }
+    try:
+        with override_settings(CACHES=caches):
+            yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.caches_context = isolated_caches('yatube-test-cache-')
+        self.caches_context.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self.caches_context.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,355 @@
+"""Двухуровневый кеш: L1 в памяти процесса перед общим L2 в SQLite.
+
+L2 -- файл SQLite (LOCATION), общий для всех процессов-воркеров. L1 --
+ограниченный LRU в памяти процесса, общий для его потоков: повторное
+чтение ключа не ходит в файл. Каждая запись в L2 той же транзакцией
+добавляет ключ в журнал инвалидаций. Процессы читают журнал с последнего
+прочитанного id и выбрасывают из своего L1 ключи, измененные другими
+процессами, -- в начале каждого запроса и не реже раза
+в L1_POLL_INTERVAL секунд.
+
+add и incr выполняются в L2 под блокировкой записи SQLite, поэтому
+блокировки single_flight и счетчики работают между процессами.
+
+OPTIONS: L1_MAX_ENTRIES (1000), L1_POLL_INTERVAL (0.05 с), MAX_ENTRIES
+и CULL_FREQUENCY для L2 -- как у встроенных бэкендов Django.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.signals import request_started
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS cache_entry ('
+    ' key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)',
+    # key NULL -- очистка всего кеша.
+    'CREATE TABLE IF NOT EXISTS cache_invalidation ('
+    ' id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT,'
+    ' origin INTEGER NOT NULL)',
+]
+# Сколько последних записей хранит журнал. Процесс, отставший сильнее,
+# очищает свой L1 целиком.
+JOURNAL_KEEP = 10000
+# Раз в столько записей журнала удаляются старые записи и проверяется
+# размер L2.
+MAINTENANCE_EVERY = 500
+# Ключей в одном IN (...) -- ниже лимита параметров SQLite.
+CHUNK_SIZE = 500
+
+_MISSING = object()
+
+
+class LocalTier:
+    """L1 одного LOCATION в процессе: LRU из pickle-значений."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # Записи процесса в L2 идут по одной: порядок обновлений L1
+        # совпадает с порядком коммитов.
+        self.write_lock = threading.Lock()
+        # Меняется при каждом изменении ключей: чтение из L2, начатое
+        # до изменения, не кладет в L1 устаревшее значение.
+        self.generation = 0
+        self.last_id = None
+        self.polled = 0.0
+
+    def get(self, key, now):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return _MISSING
+            pickled, expires = entry
+            if expires is not None and expires <= now:
+                del self.entries[key]
+                return _MISSING
+            self.entries.move_to_end(key)
+            return pickled
+
+    def put(self, items, generation=None):
+        """items -- {ключ: (pickle, expires) или None для удаления}."""
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            for key, entry in items.items():
+                if entry is None:
+                    self.entries.pop(key, None)
+                else:
+                    self.entries[key] = entry
+                    self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def evict(self, keys):
+        with self.lock:
+            self.generation += 1
+            for key in keys:
+                if key is None:
+                    self.entries.clear()
+                else:
+                    self.entries.pop(key, None)
+
+
+_tiers = {}
+_tiers_lock = threading.Lock()
+
+
+@request_started.connect
+def poll_on_request(**kwargs):
+    # Запрос видит все, что другие процессы записали до его начала.
+    for tier in list(_tiers.values()):
+        tier.polled = 0.0
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._poll_interval = options.get('L1_POLL_INTERVAL', 0.05)
+        with _tiers_lock:
+            if location not in _tiers:
+                _tiers[location] = LocalTier(
+                    options.get('L1_MAX_ENTRIES', 1000))
+            self._tier = _tiers[location]
+        self._local = threading.local()
+
+    def _connection(self):
+        # Соединение SQLite нельзя делить между потоками и переносить
+        # через fork.
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self._path, timeout=20,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            for sql in SCHEMA:
+                connection.execute(sql)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def _poll(self):
+        """Выбрасывает из L1 ключи, которые изменили другие процессы."""
+        tier = self._tier
+        now = time.monotonic()
+        if now - tier.polled < self._poll_interval:
+            return
+        tier.polled = now
+        connection = self._connection()
+        if tier.last_id is None:
+            tier.last_id = connection.execute(
+                'SELECT COALESCE(MAX(id), 0) FROM cache_invalidation'
+            ).fetchone()[0]
+            return
+        rows = connection.execute(
+            'SELECT id, key, origin FROM cache_invalidation WHERE id > ? '
+            'ORDER BY id', [tier.last_id]).fetchall()
+        if not rows:
+            return
+        if rows[0][0] != tier.last_id + 1:
+            # Пропущенные записи уже удалены из журнала.
+            keys = [None]
+        else:
+            pid = os.getpid()
+            keys = [key for _, key, origin in rows if origin != pid]
+        tier.last_id = rows[-1][0]
+        if keys:
+            tier.evict(keys)
+
+    @contextmanager
+    def _writing(self):
+        """Транзакция записи в L2. Блок дополняет словарь изменений L1,
+        изменения применяются к L1 и журналу после коммита."""
+        changes = {}
+        # Читатель журнала должен начать с id не позже первой записи
+        # в L1, иначе чужие изменения до нее пропадут.
+        self._poll()
+        with self._tier.write_lock:
+            connection = self._connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection, changes
+                if changes:
+                    self._journal(connection, list(changes))
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+            tier = self._tier
+            with tier.lock:
+                tier.generation += 1
+            tier.put({key: entry for key, entry in changes.items()
+                      if key is not None})
+            if None in changes:
+                tier.evict([None])
+
+    def _journal(self, connection, keys):
+        pid = os.getpid()
+        connection.executemany(
+            'INSERT INTO cache_invalidation (key, origin) VALUES (?, ?)',
+            [(key, pid) for key in keys])
+        last_id = connection.execute(
+            'SELECT last_insert_rowid()').fetchone()[0]
+        if last_id // MAINTENANCE_EVERY != (
+                last_id - len(keys)) // MAINTENANCE_EVERY:
+            connection.execute(
+                'DELETE FROM cache_invalidation WHERE id <= ?',
+                [last_id - JOURNAL_KEEP])
+            self._cull(connection)
+
+    def _cull(self, connection):
+        connection.execute('DELETE FROM cache_entry WHERE expires <= ?',
+                           [time.time()])
+        count = connection.execute(
+            'SELECT COUNT(*) FROM cache_entry').fetchone()[0]
+        if count > self._max_entries:
+            # Удаленные так ключи не меняются, а пропадают: в журнал
+            # они не пишутся, копии в L1 остаются верными.
+            connection.execute(
+                'DELETE FROM cache_entry WHERE rowid IN ('
+                'SELECT rowid FROM cache_entry ORDER BY rowid LIMIT ?)',
+                [count // self._cull_frequency])
+
+    def _fetch(self, keys):
+        """Живые значения ключей из L1, недостающие -- из L2."""
+        self._poll()
+        now = time.time()
+        tier = self._tier
+        found = {}
+        missing = []
+        for key in keys:
+            pickled = tier.get(key, now)
+            if pickled is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = pickled
+        if missing:
+            generation = tier.generation
+            loaded = {}
+            connection = self._connection()
+            for start in range(0, len(missing), CHUNK_SIZE):
+                chunk = missing[start:start + CHUNK_SIZE]
+                rows = connection.execute(
+                    'SELECT key, value, expires FROM cache_entry '
+                    'WHERE key IN ({}) AND (expires IS NULL OR expires > ?)'
+                    .format(', '.join('?' * len(chunk))), [*chunk, now])
+                for key, value, expires in rows:
+                    loaded[key] = (value, expires)
+            tier.put(loaded, generation)
+            found.update((key, value) for key, (value, _) in loaded.items())
+        return found
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        pickled = self._fetch([key]).get(key)
+        if pickled is None:
+            return default
+        return pickle.loads(pickled)
+
+    def get_many(self, keys, version=None):
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        found = self._fetch(list(made))
+        return {made[key]: pickle.loads(value)
+                for key, value in found.items()}
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key in self._fetch([key])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        if expires is not None and expires <= time.time():
+            self.delete_many(list(data), version)
+            return []
+        rows = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            rows.append((key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                         expires))
+        with self._writing() as (connection, changes):
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache_entry (key, value, expires) '
+                'VALUES (?, ?, ?)', rows)
+            for key, pickled, expires in rows:
+                changes[key] = (pickled, expires)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expires = self.get_backend_timeout(timeout)
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._writing() as (connection, changes):
+            # Занятый ключ перезаписывается, только если он истек.
+            added = connection.execute(
+                'INSERT INTO cache_entry (key, value, expires) '
+                'VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE SET '
+                'value = excluded.value, expires = excluded.expires '
+                'WHERE cache_entry.expires <= ?',
+                [key, pickled, expires, time.time()]).rowcount == 1
+            if added:
+                changes[key] = (pickled, expires)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._writing() as (connection, changes):
+            row = connection.execute(
+                'SELECT value, expires FROM cache_entry WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                [key, time.time()]).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            connection.execute(
+                'UPDATE cache_entry SET value = ? WHERE key = ?',
+                [pickled, key])
+            changes[key] = (pickled, row[1])
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expires = self.get_backend_timeout(timeout)
+        with self._writing() as (connection, changes):
+            touched = connection.execute(
+                'UPDATE cache_entry SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                [expires, key, time.time()]).rowcount == 1
+            if touched:
+                changes[key] = None
+        return touched
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+        with self._writing() as (connection, changes):
+            connection.executemany('DELETE FROM cache_entry WHERE key = ?',
+                                   [(key,) for key in keys])
+            changes.update(dict.fromkeys(keys))
+
+    def clear(self):
+        with self._writing() as (connection, changes):
+            connection.execute('DELETE FROM cache_entry')
+            changes[None] = None
@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+from . import metrics
+
+
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        raise Http404
+    return HttpResponse(metrics.render(),
+                        content_type='text/plain; version=0.0.4')
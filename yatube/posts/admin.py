@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Group, Post
+from .search import search_ids
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -17,6 +18,13 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по полнотекстовому индексу вместо LIKE '%term%'.
+        ids = search_ids(search_term)
+        if ids is None:
+            return queryset, False
+        return queryset.filter(id__in=ids), False
+
 
 admin.site.register(Post, PostAdmin),
 admin.site.register(Group)
@@ -0,0 +1,202 @@
+"""Read-only JSON API постов, групп и авторов.
+
+Ответы собираются из values() с JOIN, без моделей и шаблонов. Списки
+постов идут keyset-страницами, ?fields= оставляет только нужные поля,
+ETag и Last-Modified строятся из тех же меток версий, что и у HTML.
+"""
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import require_GET
+
+from core.db_router import replica_reads
+
+from . import lookups, versions
+from .conditional import conditional_page, post_validators
+from .models import Group, Post, PostCounter
+from .page_cache import feed_version_keys
+from .utils import cursor_paginator
+
+User = get_user_model()
+
+# Поле ответа -> колонки values(), из которых оно собирается.
+POST_FIELDS = {
+    'id': ('id',),
+    'text': ('text',),
+    'pub_date': ('pub_date',),
+    'group': ('group__slug',),
+    'author': ('author__username', 'author__first_name',
+               'author__last_name'),
+}
+GROUP_FIELDS = ('slug', 'title', 'description')
+MAX_LIMIT = 100
+
+
+class BadRequest(Exception):
+    pass
+
+
+def error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def requested_fields(request):
+    fields = request.GET.get('fields')
+    if not fields:
+        return tuple(POST_FIELDS)
+    fields = tuple(dict.fromkeys(
+        name.strip() for name in fields.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in POST_FIELDS]
+    if unknown or not fields:
+        raise BadRequest('Неизвестные поля: ' + ', '.join(unknown))
+    return fields
+
+
+def post_values(queryset, fields):
+    """values() только с колонками запрошенных полей; pub_date и id
+    нужны всегда -- это ключ пагинации."""
+    columns = {'id', 'pub_date'}
+    for name in fields:
+        columns.update(POST_FIELDS[name])
+    return queryset.values(*sorted(columns))
+
+
+def serialize_post(row, fields):
+    data = {}
+    for name in fields:
+        if name == 'author':
+            data['author'] = {
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+            }
+        elif name == 'group':
+            data['group'] = row['group__slug']
+        elif name == 'pub_date':
+            data['pub_date'] = row['pub_date'].isoformat()
+        else:
+            data[name] = row[name]
+    return data
+
+
+def page_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return request.build_absolute_uri(
+        request.path + '?' + params.urlencode())
+
+
+def posts_validators(request):
+    keys = []
+    if request.GET.get('group'):
+        keys += feed_version_keys('group_posts',
+                                  {'slug': request.GET['group']})
+    if request.GET.get('author'):
+        keys += feed_version_keys('profile',
+                                  {'username': request.GET['author']})
+    return keys or feed_version_keys('index', {})
+
+
+def groups_validators(request):
+    # Своя метка: новая группа меняет список, но не ленты.
+    return [versions.feed_key('group_list')]
+
+
+def group_validators(request, slug):
+    # У 404 нет валидаторов: иначе после создания группы клиент
+    # получал бы 304 на закешированный 404.
+    try:
+        lookups.get_group_or_404(slug)
+    except Http404:
+        return None
+    return [versions.feed_key('groups')]
+
+
+def author_validators(request, username):
+    try:
+        lookups.get_author_or_404(username)
+    except Http404:
+        return None
+    return [versions.feed_key('authors'),
+            versions.feed_key('profile', username)]
+
+
+def api_view(view):
+    """GET-only view с чтением с реплик, BadRequest превращается
+    в ответ 400."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as exception:
+            return error(str(exception), 400)
+    return require_GET(replica_reads(wrapper))
+
+
+@api_view
+@conditional_page(posts_validators)
+def posts(request):
+    """Лента постов; ?group=<slug>, ?author=<username> сужают ее."""
+    fields = requested_fields(request)
+    try:
+        limit = min(int(request.GET.get('limit', 10)), MAX_LIMIT)
+    except ValueError:
+        raise BadRequest('limit должен быть числом')
+    if limit < 1:
+        raise BadRequest('limit должен быть положительным')
+    queryset = Post.objects.all()
+    if request.GET.get('group'):
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        queryset = queryset.filter(author__username=request.GET['author'])
+    page = cursor_paginator(post_values(queryset, fields),
+                            request.GET.get('cursor'), per_page=limit)
+    return JsonResponse({
+        'results': [serialize_post(row, fields) for row in page],
+        'next': page_url(request, page.next_cursor),
+        'previous': page_url(request, page.previous_cursor),
+    })
+
+
+@api_view
+@conditional_page(post_validators)
+def post(request, post_id):
+    fields = requested_fields(request)
+    row = post_values(Post.objects.filter(pk=post_id), fields).first()
+    if row is None:
+        return error('Пост не найден', 404)
+    return JsonResponse(serialize_post(row, fields))
+
+
+@api_view
+@conditional_page(groups_validators)
+def groups(request):
+    rows = Group.objects.order_by('slug').values(*GROUP_FIELDS)
+    return JsonResponse({'results': list(rows)})
+
+
+@api_view
+@conditional_page(group_validators)
+def group(request, slug):
+    row = Group.objects.filter(slug=slug).values(*GROUP_FIELDS).first()
+    if row is None:
+        return error('Группа не найдена', 404)
+    return JsonResponse(row)
+
+
+@api_view
+@conditional_page(author_validators)
+def author(request, username):
+    row = User.objects.filter(username=username).values(
+        'id', 'username', 'first_name', 'last_name').first()
+    if row is None:
+        return error('Автор не найден', 404)
+    return JsonResponse({
+        'username': row['username'],
+        'first_name': row['first_name'],
+        'last_name': row['last_name'],
+        'posts_count': PostCounter.objects.posts_count(row['id']),
+    })
@@ -0,0 +1,13 @@
+from django.urls import path
+
+from . import api
+
+
+app_name = 'api'
+urlpatterns = [
+    path('posts/', api.posts, name='posts'),
+    path('posts/<int:post_id>/', api.post, name='post'),
+    path('groups/', api.groups, name='groups'),
+    path('groups/<slug:slug>/', api.group, name='group'),
+    path('authors/<str:username>/', api.author, name='author'),
+]
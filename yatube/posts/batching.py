@@ -0,0 +1,145 @@
+"""Групповая запись новых постов (group commit).
+
+Под всплеском записи каждый post_create -- своя транзакция, свое
+ожидание блокировки записи SQLite и свой коммит. PostWriteBatcher копит
+посты из потоков-запросов в очереди и сохраняет их одной транзакцией
+в фоновом потоке: первый пост пачки ждет попутчиков не дольше window
+секунд, в пачке не больше batch_size постов. Пачка пишется одним
+bulk_create, счетчики и ленты обновляются разом на всю пачку, а id
+постов берутся из sqlite_sequence. Запрос ждет свой пост через Future.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import (
+    close_old_connections, connection, connections, transaction)
+
+from core import db_router
+
+from .models import Post
+
+# Сколько запрос ждет сохранения поста, прежде чем сдаться.
+SAVE_TIMEOUT = 30
+
+
+class PostWriteBatcher:
+    def __init__(self, window=None, batch_size=None):
+        self.window = (settings.POST_BATCH_WINDOW if window is None
+                       else window)
+        self.batch_size = (settings.POST_BATCH_SIZE if batch_size is None
+                           else batch_size)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def save(self, post):
+        """Сохраняет пост в ближайшей пачке и возвращает его с id."""
+        future = Future()
+        self._start()
+        self._queue.put((post, future))
+        future.result(SAVE_TIMEOUT)
+        # Запись прошла в другом потоке, мимо роутера этого запроса.
+        db_router.pin_primary()
+        return post
+
+    def stop(self):
+        """Дописывает очередь и останавливает фоновый поток."""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='post-write-batcher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                deadline = time.monotonic() + self.window
+                while len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self._queue.put(None)
+                        break
+                    batch.append(item)
+                # Как на границе запроса: закрыть устаревшее соединение.
+                close_old_connections()
+                self._commit(batch)
+        finally:
+            connections.close_all()
+
+    def _commit(self, batch):
+        posts = [post for post, future in batch]
+        try:
+            if len(posts) == 1:
+                posts[0].save()
+            else:
+                self._insert(posts)
+        except Exception as error:
+            if len(batch) == 1:
+                batch[0][1].set_exception(error)
+                return
+            # Один плохой пост не должен ронять остальные: повторяем
+            # пачку по одному посту.
+            for post, future in batch:
+                post.pk = None
+                self._commit([(post, future)])
+            return
+        for post, future in batch:
+            future.set_result(post.pk)
+
+    def _insert(self, posts):
+        """Пачка одним INSERT; счетчики на всю пачку обновляет
+        bulk_create, а ленты сбрасываются после COMMIT (posts_changed).
+
+        Транзакция начинается с BEGIN IMMEDIATE (core.sqlite_backend),
+        других писателей нет, и AUTOINCREMENT выдает пачке id подряд
+        после последнего значения sqlite_sequence.
+        """
+        with transaction.atomic():
+            first_id = last_id(Post) + 1
+            Post.objects.bulk_create(posts)
+            ids = range(first_id, last_id(Post) + 1)
+            if len(ids) != len(posts):
+                raise RuntimeError('id пачки постов выданы не подряд')
+            for post, pk in zip(posts, ids):
+                post.pk = pk
+
+
+def last_id(model):
+    """Последний выданный AUTOINCREMENT id таблицы модели."""
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s',
+                       [model._meta.db_table])
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+batcher = PostWriteBatcher()
+
+
+def save_post(post):
+    """Сохраняет новый пост: пачкой при POST_BATCH_ENABLED, иначе сразу."""
+    if not settings.POST_BATCH_ENABLED:
+        post.save()
+        return post
+    return batcher.save(post)
@@ -0,0 +1,182 @@
+"""Замеры всех view приложений posts, users и about на растущих данных.
+
+Для каждого размера базы и каждого сценария пишется медианное время
+ответа, число SQL-запросов и пиковая память Python (tracemalloc).
+Замеры идут на временных файловых кешах, которые очищаются перед каждым
+запросом: меряется холодный рендер, а кеши сервера не трогаются.
+"""
+import statistics
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.test_runner import isolated_caches
+from posts.models import Group, Post, PostCounter
+from posts.seeding import seed_dataset
+
+User = get_user_model()
+
+# (имя, имя URL, нужен ли вход, параметры запроса, функция kwargs URL).
+SCENARIOS = (
+    ('index', 'posts:index', False, {}, None),
+    ('index_page_2', 'posts:index', False, {'page': 2}, None),
+    ('index_last_page', 'posts:index', False, {'page': 'last'}, None),
+    ('index_authenticated', 'posts:index', True, {}, None),
+    ('group_posts', 'posts:group_posts', False, {},
+     lambda data: {'slug': data['group_slug']}),
+    ('profile', 'posts:profile', False, {},
+     lambda data: {'username': data['author_username']}),
+    ('post_detail', 'posts:post_detail', False, {},
+     lambda data: {'post_id': data['post_id']}),
+    ('post_create', 'posts:post_create', True, {}, None),
+    ('post_edit', 'posts:post_edit', True, {},
+     lambda data: {'post_id': data['post_id']}),
+    ('search', 'posts:search', False, {'q': 'котики'}, None),
+    ('signup', 'users:signup', False, {}, None),
+    ('login', 'users:login', False, {}, None),
+    ('logout', 'users:logout', True, {}, None),
+    ('about_author', 'about:author', False, {}, None),
+    ('about_tech', 'about:tech', False, {}, None),
+)
+
+
+def grow_dataset(size, seed=0):
+    """Досоздает посты до size штук, добавляя новых авторов и группы."""
+    missing = size - Post.objects.count()
+    if missing > 0:
+        seed_dataset(max(1, missing // 50), max(1, missing // 5000), missing,
+                     seed=seed + size, batch_size=5000,
+                     prefix=f'bench{size}')
+
+
+def dataset_targets():
+    """Самые тяжелые объекты базы: крупнейшие автор и группа,
+    свежий пост и его автор."""
+    author_id = (PostCounter.objects.order_by('-posts_count')
+                 .values_list('author_id', flat=True).first())
+    group_slug = (Group.objects.annotate(size=Count('posts'))
+                  .order_by('-size').values_list('slug', flat=True).first())
+    post = Post.objects.select_related('author').first()
+    return {
+        'author_username': User.objects.get(pk=author_id).username,
+        'group_slug': group_slug,
+        'post_id': post.pk,
+        'post_author': post.author,
+    }
+
+
+def make_client(user=None):
+    client = Client(HTTP_HOST=(settings.ALLOWED_HOSTS or ['localhost'])[0])
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def clear_caches():
+    for alias in settings.CACHES:
+        caches[alias].clear()
+
+
+def measure(url, params, user, repeat):
+    """Медиана времени по repeat запросам, затем отдельный проход
+    с подсчетом запросов и памяти, чтобы они не искажали время."""
+    durations = []
+    for _ in range(repeat):
+        client = make_client(user)
+        clear_caches()
+        started = time.perf_counter()
+        response = client.get(url, params)
+        durations.append(time.perf_counter() - started)
+
+    client = make_client(user)
+    clear_caches()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url, params)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': response.status_code,
+        'time_ms': statistics.median(durations) * 1000,
+        'queries': len(queries),
+        'peak_kb': peak / 1024,
+    }
+
+
+def resolve_params(params):
+    if params.get('page') != 'last':
+        return params
+    last_page = max(1, -(-Post.objects.count() // settings.POSTS_PER_PAGE))
+    return dict(params, page=last_page)
+
+
+def run_benchmarks(sizes, repeat=3, scenarios=None, progress=None):
+    """Возвращает {размер: {сценарий: замер}} для возрастающих sizes."""
+    results = {}
+    with isolated_caches('yatube-benchmark-'):
+        for size in sorted(sizes):
+            grow_dataset(size)
+            data = dataset_targets()
+            results[str(size)] = {}
+            for name, url_name, login, params, kwargs in SCENARIOS:
+                if scenarios and name not in scenarios:
+                    continue
+                url = reverse(url_name,
+                              kwargs=kwargs(data) if kwargs else None)
+                user = data['post_author'] if login else None
+                results[str(size)][name] = measure(
+                    url, resolve_params(params), user, repeat)
+                if progress:
+                    progress(size, name, results[str(size)][name])
+    return results
+
+
+def compare(results, baseline, max_regression):
+    """Регрессии относительно baseline: рост времени или памяти больше
+    max_regression и любой рост числа запросов."""
+    regressions = []
+    for size, scenarios in results.items():
+        for name, result in scenarios.items():
+            previous = baseline.get(size, {}).get(name)
+            if not previous:
+                continue
+            if result['queries'] > previous['queries']:
+                regressions.append(
+                    f'{size}/{name}: запросов {result["queries"]} '
+                    f'> {previous["queries"]}')
+            for metric in ('time_ms', 'peak_kb'):
+                limit = previous[metric] * (1 + max_regression)
+                if result[metric] > limit:
+                    regressions.append(
+                        f'{size}/{name}: {metric} {result[metric]:.1f} '
+                        f'> {limit:.1f}')
+    return regressions
+
+
+def format_report(results):
+    """Таблица: строка на сценарий, по столбцу на размер базы."""
+    sizes = list(results)
+    names = list(dict.fromkeys(
+        name for scenarios in results.values() for name in scenarios))
+    header = f'{"view":<20}' + ''.join(
+        f'{size + " posts":>28}' for size in sizes)
+    lines = [header, f'{"":<20}' + f'{"ms / queries / KiB":>28}' * len(sizes)]
+    for name in names:
+        cells = []
+        for size in sizes:
+            result = results[size].get(name)
+            cells.append(
+                f'{result["time_ms"]:>10.1f} {result["queries"]:>6} '
+                f'{result["peak_kb"]:>10.0f}' if result else f'{"-":>28}')
+        lines.append(f'{name:<20}' + ''.join(f'{cell:>28}' for cell in cells))
+    return '\n'.join(lines)
@@ -0,0 +1,74 @@
+import time
+from datetime import datetime, timezone
+from hashlib import md5
+
+from django.views.decorators.http import condition
+
+from core import db_router
+
+from . import versions
+from .models import Post
+from .page_cache import feed_version_keys
+
+
+def conditional_page(version_keys):
+    """Отвечает 304 на If-None-Match/If-Modified-Since до работы view.
+
+    version_keys(request, **kwargs) возвращает метки версий, от которых
+    зависит страница (или None, если страницы нет). ETag строится из
+    меток, адреса и пользователя, Last-Modified -- самая свежая метка.
+    При чтении с реплики к меткам добавляется время ее обновления.
+    """
+    def validators(request, **kwargs):
+        if not hasattr(request, '_page_validators'):
+            keys = version_keys(request, **kwargs)
+            if keys is None:
+                request._page_validators = None, None
+                return request._page_validators
+            if request.user.is_authenticated:
+                keys.append(versions.author_key(request.user.pk))
+            stamps = versions.get_versions(keys)
+            replica_stamp = db_router.replica_stamp()
+            if replica_stamp is not None:
+                stamps['replica'] = replica_stamp
+            etag = md5('|'.join([
+                request.get_full_path(), str(request.user.pk),
+                *(repr(stamps[key]) for key in sorted(stamps)),
+            ]).encode()).hexdigest()
+            newest = int(max(stamps.values()))
+            last_modified = None
+            if time.time() >= newest + 1:
+                last_modified = datetime.fromtimestamp(newest,
+                                                       tz=timezone.utc)
+            request._page_validators = etag, last_modified
+        return request._page_validators
+
+    return condition(
+        etag_func=lambda request, **kwargs: validators(
+            request, **kwargs)[0],
+        last_modified_func=lambda request, **kwargs: validators(
+            request, **kwargs)[1],
+    )
+
+
+def feed_validators(feed):
+    def version_keys(request, **kwargs):
+        return feed_version_keys(feed, kwargs)
+    return version_keys
+
+
+def post_validators(request, post_id):
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id', 'author__username').first()
+    if post is None:
+        return None
+    author_id, group_id, username = post
+    keys = [
+        versions.post_key(post_id),
+        versions.author_key(author_id),
+        # Страница поста показывает число постов автора.
+        versions.feed_key('profile', username),
+    ]
+    if group_id:
+        keys.append(versions.group_key(group_id))
+    return keys
@@ -0,0 +1,65 @@
+"""Потоковая выгрузка постов в JSONL и CSV.
+
+Посты читаются пачками по id (keyset), поэтому память не растет с
+числом строк, а выгрузку можно продолжить с места обрыва: ?after=<id>
+последней полученной строки.
+"""
+import csv
+import json
+
+from .models import Post
+
+FIELDS = ('id', 'pub_date', 'author', 'group', 'text')
+FORMATS = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+CHUNK_SIZE = 2000
+
+
+def export_rows(queryset=None, after=0, chunk_size=CHUNK_SIZE):
+    """Строки постов в порядке id, начиная после id=after."""
+    if chunk_size < 1:
+        # Проверяется сразу, а не при первом обходе генератора.
+        raise ValueError('chunk_size должен быть положительным')
+    return _chunked_rows(queryset, after, chunk_size)
+
+
+def _chunked_rows(queryset, after, chunk_size):
+    if queryset is None:
+        queryset = Post.objects.all()
+    queryset = queryset.order_by('id').values_list(
+        'id', 'pub_date', 'author__username', 'group__slug', 'text')
+    while True:
+        chunk = list(queryset.filter(id__gt=after)[:chunk_size])
+        for post_id, pub_date, author, group, text in chunk:
+            yield {
+                'id': post_id,
+                'pub_date': pub_date.isoformat(),
+                'author': author,
+                'group': group,
+                'text': text,
+            }
+        if len(chunk) < chunk_size:
+            return
+        after = chunk[-1][0]
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: отдает записанную строку обратно."""
+
+    def write(self, value):
+        return value
+
+
+def export_lines(rows, export_format, header=True):
+    """Строки выгрузки в формате jsonl или csv."""
+    if export_format == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+        return
+    writer = csv.DictWriter(_Echo(), FIELDS)
+    if header:
+        yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
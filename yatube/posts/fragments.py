@@ -0,0 +1,46 @@
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core import db_router
+
+from . import versions
+
+CARD_TEMPLATE = 'includes/post_card_{}.html'
+
+
+def card_version_keys(post):
+    keys = [versions.post_key(post.id), versions.author_key(post.author_id)]
+    if post.group_id:
+        keys.append(versions.group_key(post.group_id))
+    return keys
+
+
+def render_cards(posts, variant):
+    """HTML карточек постов, закешированных по id поста и версиям поста,
+    автора и группы.
+
+    Промахи рендерятся и пишутся в кеш одним set_many -- кроме постов,
+    прочитанных с реплики: они могут отставать от меток версий.
+    """
+    posts = list(posts)
+    version_keys = set()
+    for post in posts:
+        version_keys.update(card_version_keys(post))
+    stamps = versions.get_versions(list(version_keys))
+
+    card_keys = [
+        'post_card:{}:{}:{}'.format(variant, post.id, ':'.join(
+            repr(stamps[key]) for key in card_version_keys(post)))
+        for post in posts
+    ]
+    cards = cache.get_many(card_keys)
+    missing = {}
+    for post, key in zip(posts, card_keys):
+        if key not in cards:
+            missing[key] = render_to_string(CARD_TEMPLATE.format(variant),
+                                            {'post': post})
+    if missing:
+        if not any(db_router.is_replica(post._state.db) for post in posts):
+            cache.set_many(missing)
+        cards.update(missing)
+    return [cards[key] for key in card_keys]
@@ -0,0 +1,79 @@
+"""Группы и авторы лент через общий для воркеров кеш.
+
+Записи лежат под метками версий всех групп и всех авторов: правка или
+удаление группы или автора меняет метку, и старые записи перестают
+находиться во всех процессах. Промахи читаются из основной базы, чтобы
+в кеш не попала копия с отстающей реплики. Отсутствие объекта не
+кешируется: новую группу или автора видно сразу.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.http import Http404
+
+from core import db_router
+
+from . import versions
+from .models import Group
+
+User = get_user_model()
+
+# Поля автора, которые нужны лентам; пароль и почта в кеш не попадают.
+AUTHOR_FIELDS = ('id', 'username', 'first_name', 'last_name')
+
+
+def cached_lookup(kind, stamp_key, lookup, values):
+    """{value: lookup(value)} для values; lookup(values) получает
+    недостающие значения и возвращает словарь найденных."""
+    cache = caches[settings.SHARED_CACHE_ALIAS]
+    stamp = versions.get_versions([stamp_key])[stamp_key]
+    keys = {f'lookup:{kind}:{stamp!r}:{value}': value for value in values}
+    found = {keys[key]: result
+             for key, result in cache.get_many(list(keys)).items()}
+    missing = [value for value in values if value not in found]
+    if missing:
+        with db_router.primary():
+            loaded = lookup(missing)
+        cache.set_many({f'lookup:{kind}:{stamp!r}:{value}': result
+                        for value, result in loaded.items()})
+        found.update(loaded)
+    return found
+
+
+def get_group_or_404(slug):
+    group = cached_lookup(
+        'group', versions.feed_key('groups'),
+        lambda slugs: Group.objects.in_bulk(slugs, field_name='slug'),
+        [slug]).get(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
+    return group
+
+
+def get_author_or_404(username):
+    author = cached_lookup(
+        'author', versions.feed_key('authors'),
+        lambda usernames: User.objects.only(*AUTHOR_FIELDS).in_bulk(
+            usernames, field_name='username'),
+        [username]).get(username)
+    if author is None:
+        raise Http404('Автор не найден')
+    return author
+
+
+def usernames(author_ids):
+    """Имена пользователей по id; несуществующие id пропускаются."""
+    return cached_lookup(
+        'username', versions.feed_key('authors'),
+        lambda ids: dict(User.objects.filter(pk__in=ids).values_list(
+            'pk', 'username')),
+        [pk for pk in author_ids if pk is not None]).values()
+
+
+def group_slugs(group_ids):
+    """slug групп по id; несуществующие id пропускаются."""
+    return cached_lookup(
+        'group_slug', versions.feed_key('groups'),
+        lambda ids: dict(Group.objects.filter(pk__in=ids).values_list(
+            'pk', 'slug')),
+        [pk for pk in group_ids if pk is not None]).values()
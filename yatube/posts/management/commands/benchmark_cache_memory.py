@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from core.shm_cache import SharedMemoryCache
+from posts.seeding import make_text
+
+
+def pss_kib(pid):
+    """Proportional set size процесса: общие страницы делятся поровну
+    между процессами, которые их видят."""
+    with open(f'/proc/{pid}/smaps_rollup') as smaps:
+        for line in smaps:
+            if line.startswith('Pss:'):
+                return int(line.split()[1])
+    raise CommandError('В smaps_rollup нет Pss')
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает память, которую занимают одни и те же страницы '
+            'в кеше нескольких воркеров: LocMem (копия в каждом процессе) '
+            'и SharedMemoryCache (одна копия на машину).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--pages', type=int, default=500)
+        parser.add_argument('--page-words', type=int, default=2000,
+                            help='Слов в одной странице (~15 КиБ HTML).')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, workers, pages, page_words, seed, **options):
+        if not os.path.exists(f'/proc/{os.getpid()}/smaps_rollup'):
+            raise CommandError('Нужен Linux с /proc/<pid>/smaps_rollup.')
+        rng = random.Random(seed)
+        contents = [
+            f'<li>{make_text(rng, page_words)}</li>'.encode()
+            for _ in range(pages)
+        ]
+        size = sum(len(content) for content in contents)
+        self.stdout.write(
+            f'{pages} страниц, {size / 2 ** 20:.1f} МиБ, '
+            f'{workers} воркеров')
+
+        directory = tempfile.mkdtemp()
+        try:
+            backends = {
+                'locmem': lambda: LocMemCache(
+                    'memory', {'OPTIONS': {'MAX_ENTRIES': pages * 2}}),
+                'shared': lambda: SharedMemoryCache(
+                    os.path.join(directory, 'cache'),
+                    {'OPTIONS': {'MAX_ENTRIES': pages * 2}}),
+            }
+            for name, make_cache in backends.items():
+                used = self.measure(make_cache, contents, workers)
+                self.stdout.write(
+                    f'{name:8} {used / 1024:8.1f} МиБ на все воркеры, '
+                    f'{used / 1024 / workers:8.1f} МиБ на воркер')
+        finally:
+            shutil.rmtree(directory)
+
+    def measure(self, make_cache, contents, workers):
+        """Прирост суммарного Pss воркеров после прогрева кеша."""
+        context = multiprocessing.get_context('fork')
+        started = context.Barrier(workers + 1)
+        warmed = context.Barrier(workers + 1)
+        done = context.Event()
+
+        def worker():
+            cache = make_cache()
+            # Счетчики ссылок страниц копируются при первом обращении
+            # (copy-on-write) -- это не память кеша.
+            keys = [(f'page:{number}', content)
+                    for number, content in enumerate(contents)]
+            started.wait()
+            # Каждый воркер прогревает те же горячие страницы.
+            for key, content in keys:
+                if cache.get(key) is None:
+                    cache.set(key, {'content': content}, None)
+            warmed.wait()
+            done.wait()
+
+        processes = [context.Process(target=worker) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        try:
+            started.wait()
+            before = sum(pss_kib(process.pid) for process in processes)
+            warmed.wait()
+            after = sum(pss_kib(process.pid) for process in processes)
+        finally:
+            done.set()
+            for process in processes:
+                process.join()
+        return after - before
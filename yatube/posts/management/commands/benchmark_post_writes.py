@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+
+from core.sql_fingerprints import percentile
+from posts.batching import PostWriteBatcher
+from posts.models import Post
+from posts.seeding import isolated_database, seed_dataset
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность создания постов из многих '
+            'потоков: каждый пост своей транзакцией и групповой записью '
+            '(posts/batching.py). Работает на временной файловой базе.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--posts', type=int, default=2000,
+                            help='Постов в каждом режиме.')
+        parser.add_argument('--window', type=float,
+                            default=settings.POST_BATCH_WINDOW)
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.POST_BATCH_SIZE)
+        parser.add_argument('--synchronous',
+                            default=settings.SQLITE_PRAGMAS['synchronous'],
+                            help='PRAGMA synchronous: NORMAL или FULL.')
+
+    def handle(self, *args, **options):
+        pragmas = dict(settings.SQLITE_PRAGMAS,
+                       synchronous=options['synchronous'])
+        with override_settings(SQLITE_PRAGMAS=pragmas), \
+                isolated_database('yatube-writes-'):
+            user_ids, _ = seed_dataset(options['threads'], 0, 0,
+                                       prefix='writes')
+            batcher = PostWriteBatcher(options['window'],
+                                       options['batch_size'])
+            try:
+                modes = {
+                    'direct': lambda post: post.save(),
+                    'batched': batcher.save,
+                }
+                for mode, save in modes.items():
+                    self.report(mode, self.run(save, user_ids, options))
+            finally:
+                batcher.stop()
+
+    def run(self, save, user_ids, options):
+        per_thread = options['posts'] // options['threads']
+
+        def write(author_id):
+            samples = []
+            try:
+                for number in range(per_thread):
+                    started = time.perf_counter()
+                    save(Post(author_id=author_id, text=f'Пост {number}'))
+                    samples.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+            return samples
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['threads']) as pool:
+            results = list(pool.map(write, user_ids))
+        elapsed = time.perf_counter() - started
+        samples = [sample for result in results for sample in result]
+        return {
+            'posts': len(samples),
+            'posts_per_second': len(samples) / elapsed,
+            'p50_ms': percentile(samples, 0.5) * 1000,
+            'p95_ms': percentile(samples, 0.95) * 1000,
+        }
+
+    def report(self, mode, result):
+        self.stdout.write(
+            f'{mode:8} {result["posts"]:6} постов  '
+            f'{result["posts_per_second"]:8.0f} постов/с  '
+            f'p50 {result["p50_ms"]:6.1f} мс  p95 {result["p95_ms"]:6.1f} мс')
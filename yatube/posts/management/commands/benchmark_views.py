@@ -0,0 +1,78 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmarks.views import compare, format_report, run_benchmarks
+from posts.seeding import isolated_database
+
+
+class Command(BaseCommand):
+    help = ('Меряет время, число запросов и пиковую память всех view '
+            'на базах разного размера; с --baseline сравнивает '
+            'с прошлым замером на той же машине.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,100000,1000000',
+                            help='Размеры базы в постах через запятую.')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            help='Мерить только указанные сценарии.')
+        parser.add_argument(
+            '--baseline', metavar='PATH',
+            help='JSON прошлого замера на этой же машине: регрессии '
+                 'относительно него -- ошибка команды.')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Записать результаты в --baseline.')
+        parser.add_argument('--max-regression', type=float, default=0.25)
+        parser.add_argument('--output', help='Файл для результатов JSON.')
+        parser.add_argument('--use-current-db', action='store_true',
+                            help='Досоздавать данные в текущей базе.')
+
+    def handle(self, *args, **options):
+        sizes = self.check_options(options)
+
+        def progress(size, name, result):
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'{size} {name}: {result["time_ms"]:.1f} ms, '
+                    f'{result["queries"]} queries')
+
+        if options['use_current_db']:
+            results = run_benchmarks(sizes, options['repeat'],
+                                     options['scenarios'], progress)
+        else:
+            with isolated_database('yatube-benchmark-'):
+                results = run_benchmarks(sizes, options['repeat'],
+                                         options['scenarios'], progress)
+        self.stdout.write(format_report(results))
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as baseline_file:
+                json.dump(results, baseline_file, indent=2)
+            self.stdout.write(f'Baseline записан в {options["baseline"]}')
+        elif options['baseline']:
+            self.check_regressions(results, options['baseline'],
+                                   options['max_regression'])
+
+    def check_options(self, options):
+        """Проверяет аргументы и возвращает размеры баз."""
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes: ожидаются целые числа через запятую.')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat: нужно хотя бы 1 повторение.')
+        if options['save_baseline'] and not options['baseline']:
+            raise CommandError('--save-baseline: нужен --baseline PATH.')
+        return sizes
+
+    def check_regressions(self, results, baseline_path, max_regression):
+        with open(baseline_path) as baseline_file:
+            regressions = compare(results, json.load(baseline_file),
+                                  max_regression)
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно baseline:\n' + '\n'.join(regressions))
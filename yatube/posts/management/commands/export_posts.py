@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import CHUNK_SIZE, FORMATS, export_lines, export_rows
+from posts.models import Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает посты в JSONL или CSV пачками по id; '
+            '--after продолжает прерванную выгрузку.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=tuple(FORMATS),
+                            default='jsonl', dest='export_format')
+        parser.add_argument('--output', help='Файл; по умолчанию stdout.')
+        parser.add_argument('--author', help='Только посты этого автора.')
+        parser.add_argument('--after', type=int, default=0,
+                            help='Начать после поста с этим id.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, export_format, output, author, after,
+               chunk_size, **options):
+        if chunk_size < 1:
+            raise CommandError('--chunk-size должен быть положительным.')
+        queryset = Post.objects.all()
+        if author:
+            if not User.objects.filter(username=author).exists():
+                raise CommandError(f'Автор {author} не найден.')
+            queryset = queryset.filter(author__username=author)
+        rows = export_rows(queryset, after=after, chunk_size=chunk_size)
+        # Заголовок CSV не повторяем при дозаписи продолжения.
+        lines = export_lines(rows, export_format, header=not after)
+        if output:
+            mode = 'a' if after else 'w'
+            with open(output, mode, encoding='utf-8', newline='') as target:
+                target.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
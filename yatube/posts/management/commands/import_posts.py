@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importing import BATCH_SIZE, PostImportError, import_posts
+
+
+class Command(BaseCommand):
+    help = ('Загружает посты из JSONL-файла (формат export_posts) '
+            'пачками bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSONL.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help='Строк в одной транзакции.')
+        parser.add_argument('--create-missing', action='store_true',
+                            help='Создавать неизвестных авторов и группы.')
+        parser.add_argument('--strict', action='store_true',
+                            help='Остановиться на первой ошибочной строке.')
+
+    def handle(self, *args, path, batch_size, create_missing, strict,
+               **options):
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+
+        def progress(imported):
+            if options['verbosity'] > 1:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'Загружено: {imported} '
+                                  f'({imported / elapsed:.0f} строк/с)')
+
+        started = time.perf_counter()
+        try:
+            with open(path, encoding='utf-8') as source:
+                stats = import_posts(source, batch_size, create_missing,
+                                     strict, progress)
+        except PostImportError as error:
+            raise CommandError(f'Загрузка остановлена, {error}')
+        except (OSError, UnicodeDecodeError) as error:
+            raise CommandError(f'Загрузка прервана: {error}')
+        elapsed = time.perf_counter() - started
+
+        for error in stats['errors'][:10]:
+            self.stderr.write(f'Пропущена {error}')
+        self.stdout.write(
+            f'Загружено постов: {stats["imported"]}, '
+            f'пропущено строк: {stats["skipped"]}, '
+            f'создано авторов: {stats["authors_created"]}, '
+            f'групп: {stats["groups_created"]} '
+            f'за {elapsed:.1f} с '
+            f'({stats["imported"] / max(elapsed, 1e-9):.0f} строк/с)')
@@ -0,0 +1,214 @@
+import io
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from core.sql_fingerprints import percentile
+from posts.models import Group, Post
+from posts.seeding import isolated_database, seed_dataset
+
+User = get_user_model()
+
+# Доля запросов каждого маршрута в нагрузке.
+ROUTE_WEIGHTS = {
+    'index': 35,
+    'group_posts': 25,
+    'profile': 20,
+    'post_detail': 15,
+    'post_create': 5,
+}
+
+
+class Command(BaseCommand):
+    help = ('Нагружает yatube.wsgi.application в процессе смесью запросов '
+            'к лентам, постам и созданию постов и пишет p50/p95/p99 '
+            'по маршрутам в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--authenticated', type=float, default=0.3,
+                            help='Доля запросов от вошедших пользователей.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Файл для результатов JSON.')
+        parser.add_argument('--baseline',
+                            help='JSON прошлого прогона для сравнения p95.')
+        parser.add_argument('--max-regression', type=float, default=0.2,
+                            help='Допустимый рост p95 относительно baseline.')
+        parser.add_argument('--use-current-db', action='store_true',
+                            help='Не создавать отдельную базу для прогона.')
+
+    def handle(self, *args, **options):
+        if options['use_current_db']:
+            results = self.run(options)
+        else:
+            with isolated_database('yatube-loadtest-'):
+                results = self.run(options)
+
+        report = json.dumps(results, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report)
+        self.stdout.write(report)
+        if options['baseline']:
+            self.check_regressions(results, options['baseline'],
+                                   options['max_regression'])
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        user_ids, group_ids = seed_dataset(
+            options['users'], options['groups'], options['posts'],
+            seed=options['seed'], prefix='loadtest')
+        sessions = self.make_sessions(user_ids[:20])
+        usernames = list(User.objects.filter(pk__in=user_ids).values_list(
+            'username', flat=True))
+        slugs = list(Group.objects.filter(pk__in=group_ids).values_list(
+            'slug', flat=True))
+        post_ids = list(Post.objects.values_list('id', flat=True)[:10000])
+
+        plan = []
+        routes, weights = zip(*ROUTE_WEIGHTS.items())
+        for route in rng.choices(routes, weights, k=options['requests']):
+            authenticated = (route == 'post_create'
+                             or rng.random() < options['authenticated'])
+            session = rng.choice(sessions) if authenticated else None
+            if route == 'index':
+                path = reverse('posts:index')
+            elif route == 'group_posts':
+                path = reverse('posts:group_posts',
+                               kwargs={'slug': rng.choice(slugs)})
+            elif route == 'profile':
+                path = reverse('posts:profile',
+                               kwargs={'username': rng.choice(usernames)})
+            elif route == 'post_detail':
+                path = reverse('posts:post_detail',
+                               kwargs={'post_id': rng.choice(post_ids)})
+            else:
+                path = reverse('posts:post_create')
+            query = '' if rng.random() < 0.7 else f'page={rng.randint(2, 5)}'
+            plan.append((route, path, query, session))
+
+        from yatube.wsgi import application
+
+        timings = {route: [] for route in ROUTE_WEIGHTS}
+        errors = dict.fromkeys(ROUTE_WEIGHTS, 0)
+        lock = threading.Lock()
+
+        def worker(step):
+            route, path, query, session = step
+            status, duration = self.call(application, route, path, query,
+                                         session)
+            with lock:
+                timings[route].append(duration)
+                if status >= 400:
+                    errors[route] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            list(pool.map(worker, plan))
+        elapsed = time.perf_counter() - started
+
+        return {
+            'config': {key: options[key] for key in (
+                'users', 'groups', 'posts', 'requests', 'concurrency',
+                'authenticated', 'seed')},
+            'elapsed': elapsed,
+            'throughput': len(plan) / elapsed,
+            'routes': {
+                route: self.summarize(samples, errors[route], elapsed)
+                for route, samples in timings.items() if samples
+            },
+        }
+
+    def make_sessions(self, user_ids):
+        sessions = []
+        for user in User.objects.filter(pk__in=user_ids):
+            client = Client()
+            client.force_login(user)
+            sessions.append(
+                client.cookies[settings.SESSION_COOKIE_NAME].value)
+        return sessions
+
+    def call(self, application, route, path, query, session):
+        environ = {
+            'HTTP_HOST': (settings.ALLOWED_HOSTS or ['localhost'])[0],
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'REQUEST_METHOD': 'GET',
+        }
+        cookies = {}
+        if session:
+            cookies[settings.SESSION_COOKIE_NAME] = session
+        body = b''
+        if route == 'post_create':
+            token = get_random_string(64)
+            cookies[settings.CSRF_COOKIE_NAME] = token
+            body = urlencode({
+                'text': 'Пост из нагрузочного теста',
+                'csrfmiddlewaretoken': token,
+            }).encode()
+            environ.update({
+                'REQUEST_METHOD': 'POST',
+                'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+                'CONTENT_LENGTH': str(len(body)),
+            })
+        environ['HTTP_COOKIE'] = '; '.join(
+            f'{name}={value}' for name, value in cookies.items())
+        environ['wsgi.input'] = io.BytesIO(body)
+        setup_testing_defaults(environ)
+
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(int(status.split()[0]))
+
+        started = time.perf_counter()
+        result = application(environ, start_response)
+        try:
+            for _ in result:
+                pass
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return statuses[0], time.perf_counter() - started
+
+    def summarize(self, samples, errors, elapsed):
+        return {
+            'count': len(samples),
+            'errors': errors,
+            'throughput': len(samples) / elapsed,
+            'mean_ms': sum(samples) / len(samples) * 1000,
+            'p50_ms': percentile(samples, 0.5) * 1000,
+            'p95_ms': percentile(samples, 0.95) * 1000,
+            'p99_ms': percentile(samples, 0.99) * 1000,
+        }
+
+    def check_regressions(self, results, baseline_path, max_regression):
+        with open(baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = []
+        for route, summary in results['routes'].items():
+            previous = baseline.get('routes', {}).get(route)
+            if not previous:
+                continue
+            limit = previous['p95_ms'] * (1 + max_regression)
+            if summary['p95_ms'] > limit:
+                regressions.append(
+                    f'{route}: p95 {summary["p95_ms"]:.1f} ms '
+                    f'> {limit:.1f} ms')
+        if regressions:
+            raise CommandError('Регрессия p95: ' + '; '.join(regressions))
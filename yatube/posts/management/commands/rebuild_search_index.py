@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from posts.models import Post
+from posts.search import SEARCH_TABLE
+
+
+class Command(BaseCommand):
+    help = 'Заново заполняет полнотекстовый индекс постов.'
+
+    def handle(self, *args, **options):
+        # 'rebuild' перечитывает posts_post одной транзакцией записи:
+        # поиск до COMMIT видит старый индекс, а правка поста ждет
+        # блокировку и не шлет триггером 'delete' для строки, которой
+        # еще нет в индексе (это портит индекс с внешним содержимым).
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) "
+                f"VALUES ('rebuild')")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) "
+                f"VALUES ('optimize')")
+        self.stdout.write(
+            f'Готово, постов в индексе: {Post.objects.count()}')
@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import Post, PostCounter
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов авторов и чинит разошедшиеся.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        checked = created = repaired = 0
+        last_pk = 0
+        while True:
+            author_ids = list(
+                User.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:batch_size])
+            if not author_ids:
+                break
+            last_pk = author_ids[-1]
+            checked += len(author_ids)
+            batch_created, batch_repaired = self.repair(author_ids)
+            created += batch_created
+            repaired += batch_repaired
+        self.stdout.write(
+            f'Проверено авторов: {checked}, создано счетчиков: {created}, '
+            f'исправлено счетчиков: {repaired}')
+
+    @transaction.atomic
+    def repair(self, author_ids):
+        actual = dict.fromkeys(author_ids, 0)
+        actual.update(
+            Post.objects.filter(author_id__in=author_ids).order_by()
+            .values_list('author_id').annotate(count=Count('id')))
+        stored = PostCounter.objects.in_bulk(author_ids)
+        missing = [
+            PostCounter(author_id=author_id, posts_count=count)
+            for author_id, count in actual.items() if author_id not in stored
+        ]
+        drifted = []
+        for author_id, counter in stored.items():
+            if counter.posts_count != actual[author_id]:
+                counter.posts_count = actual[author_id]
+                drifted.append(counter)
+        PostCounter.objects.bulk_create(missing)
+        PostCounter.objects.bulk_update(drifted, ['posts_count'])
+        return len(missing), len(drifted)
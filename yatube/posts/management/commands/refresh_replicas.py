@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Обновляет реплики-копии SQLite из основной базы: целостная '
+            'копия подменяет файл реплики атомарно. Запускается по cron '
+            'чаще, чем раз в REPLICA_PIN_SECONDS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help='Алиасы реплик; по умолчанию все из DATABASE_REPLICAS.')
+
+    def handle(self, *args, aliases, **options):
+        aliases = aliases or settings.DATABASE_REPLICAS
+        unknown = set(aliases) - set(settings.DATABASE_REPLICAS)
+        if unknown:
+            raise CommandError('Не реплики: ' + ', '.join(sorted(unknown)))
+        primary = connections[DEFAULT_DB_ALIAS]
+        for alias in aliases:
+            path = connections[alias].settings_dict['NAME']
+            primary.backup_to(path)
+            self.stdout.write(f'{alias}: {path}')
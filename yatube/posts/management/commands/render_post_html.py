@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from posts.models import Post, derived_fields
+
+
+class Command(BaseCommand):
+    help = ('Заполняет готовый HTML текста (text_html) и анонс (excerpt) '
+            'у постов, где их еще нет; с --all пересчитывает все посты.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true', dest='rerender',
+                            help='Пересчитать и уже заполненные посты.')
+
+    def handle(self, *args, batch_size, rerender, **options):
+        posts = Post.objects.order_by('pk').only('id', 'text')
+        if not rerender:
+            posts = posts.filter(Q(text_html='') | Q(excerpt=''))
+        rendered = 0
+        last_pk = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            for post in batch:
+                post.sync_derived_fields()
+            with transaction.atomic():
+                Post.objects.bulk_update(batch, list(derived_fields('')))
+            rendered += len(batch)
+        self.stdout.write(f'Обработано постов: {rendered}')
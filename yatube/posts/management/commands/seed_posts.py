@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seeding import seed_dataset
+
+
+class Command(BaseCommand):
+    help = ('Быстро наполняет базу пользователями, группами и постами '
+            'для замеров производительности.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Строк в одной транзакции bulk_create.')
+        parser.add_argument('--prefix', default='seed',
+                            help='Префикс имен пользователей и slug групп.')
+        parser.add_argument('--author-skew', type=float, default=1.0,
+                            help='Показатель Ципфа для постов по авторам.')
+        parser.add_argument('--group-skew', type=float, default=1.0,
+                            help='Показатель Ципфа для постов по группам.')
+        parser.add_argument('--no-group-ratio', type=float, default=0.2,
+                            help='Доля постов без группы.')
+        parser.add_argument('--text-median', type=int, default=30,
+                            help='Медианная длина поста в словах.')
+        parser.add_argument('--text-sigma', type=float, default=0.8,
+                            help='Разброс длины поста (sigma логнормали).')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 and options['posts']:
+            raise CommandError('Для постов нужен хотя бы один пользователь.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        started = time.perf_counter()
+
+        def progress(created):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Постов: {created}')
+
+        seed_dataset(
+            options['users'], options['groups'], options['posts'],
+            seed=options['seed'], batch_size=options['batch_size'],
+            prefix=options['prefix'], author_skew=options['author_skew'],
+            group_skew=options['group_skew'],
+            no_group_ratio=options['no_group_ratio'],
+            text_median=options['text_median'],
+            text_sigma=options['text_sigma'], progress=progress)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Создано пользователей: {options["users"]}, '
+            f'групп: {options["groups"]}, постов: {options["posts"]} '
+            f'за {elapsed:.1f} с ({options["posts"] / elapsed:.0f} постов/с)')
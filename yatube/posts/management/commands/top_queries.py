@@ -0,0 +1,44 @@
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sql_fingerprints import load_stats, percentile
+
+
+class Command(BaseCommand):
+    help = 'Показывает самые тяжелые SQL-отпечатки по статистике процессов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--sort', choices=('total', 'count', 'p95'),
+                            default='total')
+        parser.add_argument('--reset', action='store_true',
+                            help='Удалить накопленную статистику.')
+
+    def handle(self, *args, limit, sort, reset, **options):
+        if not settings.SQL_STATS_DIR:
+            raise CommandError('Статистика не пишется: задайте каталог '
+                               'в YATUBE_SQL_STATS_DIR.')
+        if reset:
+            shutil.rmtree(settings.SQL_STATS_DIR, ignore_errors=True)
+            self.stdout.write('Статистика очищена')
+            return
+        rows = []
+        for entry in load_stats(settings.SQL_STATS_DIR):
+            samples = entry['samples']
+            rows.append({
+                'fingerprint': entry['fingerprint'],
+                'view': entry['view'],
+                'count': entry['count'],
+                'total': entry['total'] * 1000,
+                'p50': percentile(samples, 0.5) * 1000,
+                'p95': percentile(samples, 0.95) * 1000,
+                'p99': percentile(samples, 0.99) * 1000,
+            })
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        for row in rows[:limit]:
+            self.stdout.write(
+                '{count:>8} {total:>10.1f}ms  p50 {p50:.2f}ms  '
+                'p95 {p95:.2f}ms  p99 {p99:.2f}ms  {view}'.format(**row))
+            self.stdout.write(f'    {row["fingerprint"]}')
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:28
+
+from django.db import migrations, models
+
+# Копия триггеров поиска на момент миграции: код приложения может
+# измениться, а история миграций -- нет.
+CREATE_TRIGGERS_SQL = [
+    "CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert AFTER INSERT "
+    "ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete AFTER DELETE "
+    "ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS posts_post_fts_update AFTER UPDATE OF text "
+    "ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO posts_post_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_post_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(default='', editable=False),
+        ),
+        # SQLite пересоздал таблицу постов и потерял триггеры поиска.
+        migrations.RunSQL(CREATE_TRIGGERS_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:30
+
+from django.db import migrations, models
+
+# Копии триггеров поиска и make_excerpt на момент миграции: код
+# приложения может измениться, а история миграций -- нет.
+CREATE_TRIGGERS_SQL = [
+    "CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert AFTER INSERT "
+    "ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete AFTER DELETE "
+    "ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS posts_post_fts_update AFTER UPDATE OF text "
+    "ON posts_post BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO posts_post_fts(rowid, text) "
+    "VALUES (new.id, new.text); END",
+]
+EXCERPT_LENGTH = 300
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    head = cut.rsplit(None, 1)[0] if ' ' in cut.strip() else cut
+    return head.rstrip() + '…'
+
+
+def fill_excerpts(apps, schema_editor):
+    """Анонсы для уже существующих постов, пачками по id."""
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.using(schema_editor.connection.alias).order_by(
+        'pk').only('id', 'text')
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:1000])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        for post in batch:
+            post.excerpt = make_excerpt(post.text)
+        Post.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_text_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(default='', editable=False),
+        ),
+        # SQLite пересоздал таблицу постов и потерял триггеры поиска.
+        migrations.RunSQL(CREATE_TRIGGERS_SQL, migrations.RunSQL.noop),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
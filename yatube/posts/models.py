@@ -1,5 +1,11 @@
-from django.db import models
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import Count, F
+from django.dispatch import Signal
 from django.contrib.auth import get_user_model
+from django.template.defaultfilters import linebreaksbr
+from django.utils.safestring import mark_safe
 
 User = get_user_model()
 
@@ -13,16 +19,238 @@ class Group(models.Model):
         return self.title
 
 
+# Длина анонса поста в лентах, символов.
+EXCERPT_LENGTH = 300
+
+
+def render_text(text):
+    """HTML тела поста: экранированный текст с <br> на переносах."""
+    return str(linebreaksbr(text, autoescape=True))
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """Начало текста не длиннее length, обрезанное по границе слова."""
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    head = cut.rsplit(None, 1)[0] if ' ' in cut.strip() else cut
+    return head.rstrip() + '…'
+
+
+def derived_fields(text):
+    """Поля, которые хранятся вместе с текстом и считаются из него."""
+    return {'text_html': render_text(text), 'excerpt': make_excerpt(text)}
+
+
+# Посты изменены в обход post_save и post_delete (bulk_create, update).
+# Аргументы: post_ids -- измененные посты, author_ids и group_ids --
+# авторы и группы, чьи ленты поменялись.
+posts_changed = Signal()
+
+
+def _send_posts_changed(using, **kwargs):
+    """posts_changed после COMMIT внешней транзакции: иначе читатель
+    между сменой меток и COMMIT закешировал бы старые строки под новыми
+    метками."""
+    transaction.on_commit(
+        lambda: posts_changed.send(sender=Post, **kwargs), using=using)
+
+
+def _new_value(kwargs, name):
+    """(есть ли, id) нового автора или группы из аргументов update."""
+    for key in (f'{name}_id', name):
+        if key in kwargs:
+            return True, getattr(kwargs[key], 'pk', kwargs[key])
+    return False, None
+
+
+class PostQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, update_counters=True, **kwargs):
+        """update_counters=False -- для массовой загрузки, после которой
+        счетчики пересчитываются разом."""
+        objs = list(objs)
+        for post in objs:
+            post.sync_derived_fields()
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if update_counters:
+            PostCounter.objects.change_many(
+                Counter(post.author_id for post in objs))
+        _send_posts_changed(
+            self.db, post_ids=(),
+            author_ids={post.author_id for post in objs},
+            group_ids={post.group_id for post in objs})
+        return objs
+
+    def update(self, **kwargs):
+        if isinstance(kwargs.get('text'), str):
+            kwargs.update(derived_fields(kwargs['text']))
+        moves_author, new_author_id = _new_value(kwargs, 'author')
+        moves_group, new_group_id = _new_value(kwargs, 'group')
+        with transaction.atomic(using=self.db):
+            rows = list(self.order_by().values_list(
+                'id', 'author_id', 'group_id'))
+            updated = super().update(**kwargs)
+            if moves_author:
+                delta = Counter({new_author_id: len(rows)})
+                delta.subtract(Counter(row[1] for row in rows))
+                PostCounter.objects.change_many(delta)
+        if rows:
+            author_ids = {row[1] for row in rows}
+            group_ids = {row[2] for row in rows}
+            if moves_author:
+                author_ids.add(new_author_id)
+            if moves_group:
+                group_ids.add(new_group_id)
+            _send_posts_changed(self.db, post_ids=[row[0] for row in rows],
+                                author_ids=author_ids, group_ids=group_ids)
+        return updated
+
+    def for_feed(self):
+        """Посты для ленты: автор и группа одним JOIN, только поля
+        карточки поста. Полный текст не читается -- карточке хватает
+        анонса."""
+        return self.select_related('author', 'group').only(
+            'id', 'excerpt', 'pub_date', 'author', 'group',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__slug',
+        )
+
+
 class Post(models.Model):
     text = models.TextField()
+    # Готовый HTML текста: считается при сохранении, а не при каждом
+    # показе. Пустой у строк, которые еще не обработал render_post_html.
+    text_html = models.TextField(editable=False, default='')
+    # Анонс для карточек в лентах, чтобы списки не читали весь текст.
+    excerpt = models.TextField(editable=False, default='')
     pub_date = models.DateTimeField('date published', auto_now_add=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE,
                                related_name='posts')
     group = models.ForeignKey(Group, on_delete=models.SET_NULL,
                               related_name='posts', blank=True, null=True)
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        # Индексы под сортировку лент: общая, автора и группы.
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_feed_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_feed_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_feed_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Автор и группа на момент загрузки: по ним сигналы видят перенос
+        # поста к другому автору или в другую группу.
+        instance._loaded_author_id = instance.__dict__.get('author_id')
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        return instance
+
+    @property
+    def body_html(self):
+        if self.text_html:
+            return mark_safe(self.text_html)
+        return linebreaksbr(self.text, autoescape=True)
+
+    def sync_derived_fields(self):
+        for name, value in derived_fields(self.text).items():
+            setattr(self, name, value)
+
+    def save(self, *args, **kwargs):
+        # Отложенный text не загружаем: он и не сохранится.
+        if 'text' in self.__dict__:
+            self.sync_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, *derived_fields('')}
+        super().save(*args, **kwargs)
+        self._loaded_author_id = self.author_id
+        self._loaded_group_id = self.group_id
+
+
+class PostCounterManager(models.Manager):
+    def posts_count(self, author_id):
+        """Число постов автора; отсутствующий счетчик пересчитывается."""
+        counter = self.filter(author_id=author_id).first()
+        if counter is None:
+            return self.recount([author_id])[author_id]
+        return counter.posts_count
+
+    def change(self, author_id, delta):
+        self.change_many({author_id: delta})
+
+    def change_many(self, deltas):
+        for author_id, delta in deltas.items():
+            if not delta:
+                continue
+            counters = self.filter(author_id=author_id)
+            if delta < 0:
+                # Разошедшийся счетчик не уводим ниже нуля, а пересчитываем.
+                updated = counters.filter(posts_count__gte=-delta).update(
+                    posts_count=F('posts_count') + delta)
+                if not updated and counters.exists():
+                    self.recount([author_id])
+            elif not counters.update(posts_count=F('posts_count') + delta):
+                self.recount([author_id])
+
+    def create_missing(self, author_ids, batch_size=1000):
+        """Создает недостающие счетчики авторов одним агрегатом на пачку.
+
+        Для массовой загрузки: возвращает множество авторов, чьи
+        счетчики созданы уже с учетом всех их постов.
+        """
+        created = set()
+        author_ids = sorted(author_ids)
+        for start in range(0, len(author_ids), batch_size):
+            chunk = author_ids[start:start + batch_size]
+            # Диапазон, а не IN: не упираемся в лимит параметров SQLite.
+            in_range = {'author_id__gte': chunk[0],
+                        'author_id__lte': chunk[-1]}
+            stored = set(self.filter(**in_range).values_list(
+                'author_id', flat=True))
+            counts = dict.fromkeys(
+                (author_id for author_id in chunk if author_id not in stored),
+                0)
+            rows = (Post.objects.filter(**in_range).order_by()
+                    .values_list('author_id').annotate(count=Count('id')))
+            counts.update((author_id, count) for author_id, count in rows
+                          if author_id in counts)
+            with transaction.atomic(using=self.db):
+                self.bulk_create(
+                    PostCounter(author_id=author_id, posts_count=count)
+                    for author_id, count in counts.items())
+            created.update(counts)
+        return created
+
+    def recount(self, author_ids):
+        """Пересчитывает счетчики авторов по таблице постов."""
+        counts = dict.fromkeys(author_ids, 0)
+        counts.update(
+            Post.objects.filter(author_id__in=author_ids).order_by()
+            .values_list('author_id').annotate(count=Count('id')))
+        for author_id, count in counts.items():
+            self.update_or_create(author_id=author_id,
+                                  defaults={'posts_count': count})
+        return counts
+
+
+class PostCounter(models.Model):
+    """Денормализованное число постов автора."""
+    author = models.OneToOneField(User, on_delete=models.CASCADE,
+                                  primary_key=True,
+                                  related_name='post_counter')
+    posts_count = models.PositiveIntegerField(default=0)
+
+    objects = PostCounterManager()
+
+    def __str__(self):
+        return f'{self.author_id}: {self.posts_count}'
@@ -0,0 +1,170 @@
+import time
+from functools import wraps
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.http import HttpResponse
+
+from core import db_router, metrics
+
+from . import lookups, versions
+
+FEEDS = ('index', 'group_posts', 'profile')
+EVENTS = ('hits', 'stale', 'misses')
+# Параметры запроса, которые читают ленты. Остальные в ключ не входят:
+# иначе ?x=1, ?x=2, ... заводили бы новые записи и обходили кеш.
+PAGE_PARAMS = ('page', 'cursor')
+
+# Как часто ожидающий запрос проверяет, не готова ли страница.
+WAIT_POLL_INTERVAL = 0.01
+
+
+def feed_version_keys(feed, kwargs):
+    """Метки версий, от которых зависит страница ленты.
+
+    Кроме своей ленты страница зависит от всех групп и авторов: их
+    переименование меняет ссылки и подписи в карточках.
+    """
+    keys = [versions.feed_key('groups'), versions.feed_key('authors')]
+    if feed == 'index':
+        keys.append(versions.feed_key('index'))
+    elif feed == 'group_posts':
+        keys.append(versions.feed_key('group', kwargs['slug']))
+    elif feed == 'profile':
+        keys.append(versions.feed_key('profile', kwargs['username']))
+    return keys
+
+
+def invalidate_post_feeds(author_ids, group_ids):
+    """Сбрасывает ленты, в которые входит созданный, измененный или
+    удаленный пост."""
+    keys = [versions.feed_key('index')]
+    keys.extend(versions.feed_key('profile', name)
+                for name in lookups.usernames(author_ids))
+    keys.extend(versions.feed_key('group', slug)
+                for slug in lookups.group_slugs(group_ids))
+    versions.bump(*keys)
+
+
+def page_key(feed, request, kwargs):
+    stamps = versions.get_versions(feed_version_keys(feed, kwargs))
+    params = [(name, request.GET[name]) for name in PAGE_PARAMS
+              if name in request.GET]
+    path = md5(repr([request.path, params]).encode()).hexdigest()
+    return 'page:{}:{}:{}'.format(
+        feed, path, ':'.join(repr(stamps[key]) for key in sorted(stamps)))
+
+
+def count(feed, event):
+    key = f'page_cache:{event}:{feed}'
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Счетчик вытеснили между add и incr -- одно событие не страшно.
+        pass
+
+
+def single_flight(key, compute, fresh_timeout, timeout, lock_timeout,
+                  using=DEFAULT_CACHE_ALIAS):
+    """Значение из кеша с пересчетом не более чем одним исполнителем.
+
+    Свежее значение отдается сразу. Устаревшее отдается всем, кроме
+    одного запроса, который взял блокировку в кеше и пересчитывает его.
+    При полном промахе остальные запросы ждут пересчет, а не запускают
+    свой. compute может вернуть None -- такой результат не кешируется.
+
+    Возвращает пару (значение, событие): hits, stale или misses.
+    """
+    cache = caches[using]
+    entry = cache.get(key)
+    if entry is not None and entry['fresh_until'] > time.time():
+        return entry['value'], 'hits'
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, lock_timeout):
+        if entry is not None:
+            return entry['value'], 'stale'
+        deadline = time.time() + lock_timeout
+        while time.time() < deadline:
+            time.sleep(WAIT_POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry['value'], 'hits'
+            if cache.get(lock_key) is None:
+                break
+        return compute(), 'misses'
+    try:
+        value = compute()
+        if value is not None:
+            cache.set(key, {
+                'value': value,
+                'fresh_until': time.time() + fresh_timeout,
+            }, timeout)
+        return value, 'misses'
+    finally:
+        cache.delete(lock_key)
+
+
+def cache_anonymous_page(feed):
+    """Кеширует страницу ленты для анонимных пользователей.
+
+    Ключ страницы включает метки версий ленты, поэтому создание, правка
+    и удаление поста сбрасывают ее сразу. По истечении PAGE_CACHE_FRESH
+    страница отдается устаревшей, пока один запрос ее пересчитывает.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, **kwargs):
+            if (not settings.PAGE_CACHE_ENABLED
+                    or request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, **kwargs)
+            responses = []
+
+            def render_page():
+                # Страница живет в кеше до следующей правки, поэтому
+                # собирается из основной базы, а не с отстающей реплики.
+                with db_router.primary():
+                    response = view(request, **kwargs)
+                responses.append(response)
+                if response.status_code != 200 or response.cookies:
+                    return None
+                return {
+                    'content': response.content,
+                    'content_type': response['Content-Type'],
+                }
+
+            page, event = single_flight(
+                page_key(feed, request, kwargs), render_page,
+                settings.PAGE_CACHE_FRESH, settings.PAGE_CACHE_TIMEOUT,
+                settings.PAGE_CACHE_LOCK_TIMEOUT,
+                using=settings.SHARED_CACHE_ALIAS)
+            count(feed, event)
+            if responses:
+                return responses[0]
+            return HttpResponse(page['content'],
+                                content_type=page['content_type'])
+        return wrapper
+    return decorator
+
+
+def page_cache_stats():
+    keys = {(feed, event): f'page_cache:{event}:{feed}'
+            for feed in FEEDS for event in EVENTS}
+    values = cache.get_many(list(keys.values()))
+    return {
+        feed: {event: values.get(keys[feed, event], 0) for event in EVENTS}
+        for feed in FEEDS
+    }
+
+
+@metrics.register
+def page_cache_metrics():
+    stats = page_cache_stats()
+    for event in EVENTS:
+        name = f'yatube_page_cache_{event}_total'
+        yield f'# HELP {name} Anonymous feed page cache {event}.'
+        yield f'# TYPE {name} counter'
+        for feed, counters in stats.items():
+            yield f'{name}{{view="{feed}"}} {counters[event]}'
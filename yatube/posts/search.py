@@ -0,0 +1,69 @@
+import re
+
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+# Полнотекстовый индекс SQLite FTS5 над Post.text. Таблица и триггеры,
+# которые держат его в актуальном состоянии, создает миграция
+# 0003_post_search. SQLite удаляет триггеры вместе с таблицей, а Django
+# пересоздает таблицу при многих изменениях схемы Post, поэтому такие
+# миграции ставят их заново своей копией SQL (см. 0005_post_excerpt).
+SEARCH_TABLE = 'posts_post_fts'
+
+MATCH_SQL = (f'SELECT rowid FROM {SEARCH_TABLE} '
+             f'WHERE {SEARCH_TABLE} MATCH %s')
+# Таблица индекса присоединяется к постам (Queryset.extra): bm25
+# считается один раз на найденную строку, а не коррелированным
+# подзапросом, который повторяет MATCH для каждого поста.
+JOIN_WHERE = (f'{SEARCH_TABLE} MATCH %s',
+              f'{SEARCH_TABLE}.rowid = posts_post.id')
+SCORE_SQL = f'bm25({SEARCH_TABLE})'
+
+
+class MatchedIds(RawSQL):
+    """Подзапрос id найденных постов для фильтра id__in=...
+
+    Lookup in сам берет подзапрос в скобки, поэтому здесь их нет:
+    "IN ((SELECT ...))" SQLite понимает как одно скалярное значение.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def match_expression(query):
+    """Переводит пользовательский запрос в выражение FTS5.
+
+    Каждое слово берется в кавычки, поэтому синтаксис FTS5 из запроса
+    не исполняется; последнее слово ищется как префикс.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search(queryset, query):
+    """Посты queryset, подходящие под query, по убыванию релевантности.
+
+    Релевантность -- bm25 (меньше -- лучше) в аннотации score,
+    при равенстве порядок по id.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.none()
+    return queryset.extra(
+        tables=[SEARCH_TABLE], where=JOIN_WHERE, params=[expression],
+    ).annotate(
+        score=RawSQL(SCORE_SQL, [], output_field=FloatField()),
+    ).order_by('score', 'id')
+
+
+def search_ids(query):
+    """Подзапрос id постов для фильтра id__in=..."""
+    expression = match_expression(query)
+    if expression is None:
+        return None
+    return MatchedIds(MATCH_SQL, [expression])
@@ -0,0 +1,138 @@
+import math
+import os
+import random
+import tempfile
+from contextlib import contextmanager
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
+from django.test.utils import setup_databases, teardown_databases
+
+from core.test_runner import isolated_caches
+
+from .models import Group, Post, PostCounter
+
+User = get_user_model()
+
+WORDS = (
+    'yatube', 'пост', 'котики', 'собаки', 'путешествия', 'горы', 'море',
+    'книги', 'кино', 'музыка', 'код', 'python', 'django', 'утро', 'вечер',
+    'город', 'лес', 'дорога', 'друзья', 'работа', 'отпуск', 'фото',
+)
+
+# Пароль всех сгенерированных пользователей; хешируется один раз.
+SEED_PASSWORD = 'yatube-seed'
+
+MAX_TEXT_WORDS = 1000
+
+
+def make_text(rng, words_count):
+    return ' '.join(rng.choices(WORDS, k=words_count))
+
+
+def zipf_weights(count, skew):
+    """Накопленные веса закона Ципфа: k-й по популярности получает
+    долю, пропорциональную 1 / k ** skew. skew=0 -- равномерно."""
+    return list(accumulate(1 / rank ** skew for rank in range(1, count + 1)))
+
+
+def text_length(rng, median, sigma):
+    """Число слов поста: логнормальное распределение с медианой median."""
+    words = int(rng.lognormvariate(math.log(median), sigma))
+    return max(1, min(MAX_TEXT_WORDS, words))
+
+
+def seed_dataset(users, groups, posts, seed=0, batch_size=1000,
+                 prefix='seed', author_skew=1.0, group_skew=1.0,
+                 no_group_ratio=0.2, text_median=30, text_sigma=0.8,
+                 progress=None):
+    """Создает пользователей, группы и посты через bulk_create.
+
+    Посты распределяются по авторам и группам по закону Ципфа, длина
+    текста -- логнормальная. Данные детерминированы значением seed.
+    Возвращает списки id созданных пользователей и групп.
+    """
+    rng = random.Random(seed)
+    password = make_password(SEED_PASSWORD)
+    for start in range(0, users, batch_size):
+        with transaction.atomic():
+            User.objects.bulk_create(
+                [User(username=f'{prefix}_user_{number}', password=password)
+                 for number in range(start, min(users, start + batch_size))])
+    with transaction.atomic():
+        Group.objects.bulk_create(
+            [Group(title=f'Группа {number}', slug=f'{prefix}-group-{number}',
+                   description=make_text(rng, 10))
+             for number in range(groups)],
+            batch_size=batch_size)
+    user_ids = list(User.objects.filter(
+        username__startswith=f'{prefix}_user_').values_list('id', flat=True))
+    group_ids = list(Group.objects.filter(
+        slug__startswith=f'{prefix}-group-').values_list('id', flat=True))
+    # Популярность не должна совпадать с порядком создания.
+    rng.shuffle(user_ids)
+    rng.shuffle(group_ids)
+    author_weights = zipf_weights(len(user_ids), author_skew)
+    group_weights = zipf_weights(len(group_ids), group_skew)
+
+    for start in range(0, posts, batch_size):
+        size = min(batch_size, posts - start)
+        authors = rng.choices(user_ids, cum_weights=author_weights, k=size)
+        post_groups = (
+            rng.choices(group_ids, cum_weights=group_weights, k=size)
+            if group_ids else [None] * size)
+        with transaction.atomic():
+            # Счетчики авторов считаются один раз в конце.
+            Post.objects.bulk_create([
+                Post(author_id=author_id,
+                     group_id=(None if rng.random() < no_group_ratio
+                               else group_id),
+                     text=make_text(rng, text_length(
+                         rng, text_median, text_sigma)))
+                for author_id, group_id in zip(authors, post_groups)
+            ], update_counters=False)
+        if progress:
+            progress(start + size)
+    PostCounter.objects.create_missing(user_ids, batch_size)
+    return user_ids, group_ids
+
+
+@contextmanager
+def isolated_database(prefix='yatube-'):
+    """Временная файловая база с примененными миграциями и временные
+    файловые кеши.
+
+    Потоки видят одни и те же данные, а рабочая база и кеши сервера не
+    трогаются: страницы и метки версий из временной базы не попадают
+    в кеш, который читает рабочая.
+    """
+    connection = connections['default']
+    database = connection.settings_dict
+    test_settings = database.get('TEST')
+    # Внутри тестов текущая база -- в памяти. close() такое соединение
+    # не закрывает (база бы исчезла), и Django продолжил бы писать в нее
+    # вместо временной. Соединение откладывается до конца блока.
+    kept = None
+    if connection.is_in_memory_db():
+        kept, connection.connection = connection.connection, None
+    fd, name = tempfile.mkstemp(prefix=prefix, suffix='.sqlite3')
+    os.close(fd)
+    database['TEST'] = dict(test_settings or {}, NAME=name)
+    try:
+        with isolated_caches(prefix):
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                yield
+            finally:
+                teardown_databases(old_config, verbosity=0)
+    finally:
+        database['TEST'] = test_settings
+        if kept is not None:
+            connection.connection = kept
+        # Файлы журнала WAL Django не удаляет, а саму базу -- если
+        # создание упало.
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(name + suffix):
+                os.remove(name + suffix)
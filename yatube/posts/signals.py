@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import versions
+from .page_cache import invalidate_post_feeds
+from .models import Group, Post, PostCounter, posts_changed
+
+User = get_user_model()
+
+# Поля пользователя, которые попадают в карточки постов.
+AUTHOR_CARD_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded_author_id = getattr(instance, '_loaded_author_id', None)
+    if created:
+        PostCounter.objects.change(instance.author_id, 1)
+    elif loaded_author_id and loaded_author_id != instance.author_id:
+        PostCounter.objects.change_many({loaded_author_id: -1,
+                                         instance.author_id: 1})
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    PostCounter.objects.change(instance.author_id, -1)
+
+
+@receiver(post_save, sender=Post)
+def bump_post_version(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        versions.bump(versions.post_key(instance.id))
+
+
+@receiver(post_save, sender=Post)
+def invalidate_saved_post_feeds(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_post_feeds(
+        {instance.author_id, getattr(instance, '_loaded_author_id', None)},
+        {instance.group_id, getattr(instance, '_loaded_group_id', None)})
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_deleted_post_feeds(sender, instance, **kwargs):
+    invalidate_post_feeds({instance.author_id}, {instance.group_id})
+
+
+@receiver(posts_changed, sender=Post)
+def invalidate_changed_posts(sender, post_ids, author_ids, group_ids,
+                             **kwargs):
+    if post_ids:
+        versions.bump(*map(versions.post_key, post_ids))
+    invalidate_post_feeds(author_ids, group_ids)
+
+
+@receiver(post_save, sender=Group)
+def bump_group_version(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        # Новая группа меняет только список групп: ленты от нее не
+        # зависят, а отсутствие группы не кешируется.
+        versions.bump(versions.feed_key('group_list'))
+    else:
+        versions.bump(versions.group_key(instance.id),
+                      versions.feed_key('groups'),
+                      versions.feed_key('group_list'))
+
+
+@receiver(post_delete, sender=Group)
+def bump_groups_feed(sender, instance, **kwargs):
+    versions.bump(versions.feed_key('groups'),
+                  versions.feed_key('group_list'))
+
+
+@receiver(post_save, sender=User)
+def bump_author_version(sender, instance, created, update_fields=None,
+                        raw=False, **kwargs):
+    # Новый автор еще не попал ни в одну карточку, а его 404 в API
+    # не кешируется и не имеет валидаторов.
+    if raw or created:
+        return
+    # Вход пользователя сохраняет только last_login -- карточки не меняются.
+    if update_fields and not AUTHOR_CARD_FIELDS & set(update_fields):
+        return
+    versions.bump(versions.author_key(instance.id),
+                  versions.feed_key('authors'))
+
+
+@receiver(post_delete, sender=User)
+def bump_deleted_author(sender, instance, **kwargs):
+    versions.bump(versions.author_key(instance.id),
+                  versions.feed_key('authors'))
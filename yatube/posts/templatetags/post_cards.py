@@ -0,0 +1,11 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts.fragments import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(page_obj, variant, separator='<hr>'):
+    return mark_safe(separator.join(render_cards(page_obj, variant)))
@@ -0,0 +1,118 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+
+User = get_user_model()
+
+
+class PostApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора, группу и дюжину постов для API."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='api_author', first_name='Анна', last_name='Котова')
+        cls.group = Group.objects.create(
+            title='api group',
+            slug='api-group',
+            description='api group description',
+        )
+        for number in range(12):
+            Post.objects.create(author=cls.author, text=f'API пост {number}',
+                                group=cls.group if number % 2 else None)
+        cls.posts_url = reverse('api:posts')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_posts_are_paginated_by_cursor(self):
+        """Лента отдается keyset-страницами без повторов и пропусков."""
+        seen = []
+        url = self.posts_url + '?limit=5'
+        while url:
+            data = self.guest_client.get(url).json()
+            self.assertLessEqual(len(data['results']), 5)
+            seen.extend(post['id'] for post in data['results'])
+            url = data['next']
+        self.assertEqual(seen, list(Post.objects.values_list('id', flat=True)))
+
+    def test_sparse_fields_skip_columns_and_joins(self):
+        """fields= убирает из ответа и из запроса лишние поля."""
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(
+                self.posts_url, {'fields': 'id,group', 'group': 'api-group'})
+        results = response.json()['results']
+        self.assertEqual(len(results), 6)
+        self.assertEqual(set(results[0]), {'id', 'group'})
+
+        full = self.guest_client.get(self.posts_url).json()['results'][0]
+        self.assertEqual(full['author'], {
+            'username': 'api_author', 'first_name': 'Анна',
+            'last_name': 'Котова'})
+        response = self.guest_client.get(self.posts_url, {'fields': 'likes'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_detail_endpoints(self):
+        """Пост, группа и автор отдаются отдельными ресурсами."""
+        post = Post.objects.first()
+        cases = {
+            reverse('api:post', kwargs={'post_id': post.pk}):
+                {'id': post.pk, 'text': post.text},
+            reverse('api:group', kwargs={'slug': 'api-group'}):
+                {'slug': 'api-group', 'title': 'api group'},
+            reverse('api:author', kwargs={'username': 'api_author'}):
+                {'username': 'api_author', 'posts_count': 12},
+        }
+        for url, expected in cases.items():
+            with self.subTest(url=url):
+                data = self.guest_client.get(url).json()
+                self.assertEqual({key: data[key] for key in expected},
+                                 expected)
+        response = self.guest_client.get(
+            reverse('api:author', kwargs={'username': 'nobody'}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_conditional_requests(self):
+        """Совпавший ETag дает 304, новый пост его меняет."""
+        etag = self.guest_client.get(self.posts_url)['ETag']
+        response = self.guest_client.get(self.posts_url,
+                                         HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        Post.objects.create(author=self.author, text='Свежий API пост')
+        response = self.guest_client.get(self.posts_url,
+                                         HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_created_group_and_author_change_validators(self):
+        """Новая группа или автор не прячутся за 304 со старым ETag."""
+        groups_url = reverse('api:groups')
+        etag = self.guest_client.get(groups_url)['ETag']
+        group_url = reverse('api:group', kwargs={'slug': 'new-group'})
+        author_url = reverse('api:author', kwargs={'username': 'newcomer'})
+        for url in (group_url, author_url):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertFalse(response.has_header('ETag'))
+                self.assertFalse(response.has_header('Last-Modified'))
+
+        Group.objects.create(title='new group', slug='new-group',
+                             description='new group description')
+        User.objects.create_user(username='newcomer')
+        response = self.guest_client.get(groups_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('new-group',
+                      [row['slug'] for row in response.json()['results']])
+        for url in (group_url, author_url):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertTrue(response.has_header('ETag'))
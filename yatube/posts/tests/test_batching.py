@@ -0,0 +1,85 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.batching import PostWriteBatcher, batcher
+from posts.models import Post, PostCounter
+
+User = get_user_model()
+
+
+class PostWriteBatcherTests(TransactionTestCase):
+    """Групповая запись постов из многих потоков."""
+    threads = 8
+
+    def setUp(self):
+        cache.clear()
+        self.authors = [User.objects.create_user(username=f'writer{number}')
+                        for number in range(self.threads)]
+        self.batcher = PostWriteBatcher(window=0.05, batch_size=50)
+        self.addCleanup(self.batcher.stop)
+
+    def save_concurrently(self, posts):
+        barrier = threading.Barrier(len(posts))
+        errors = {}
+
+        def save(post):
+            barrier.wait(5)
+            try:
+                self.batcher.save(post)
+            except Exception as error:
+                errors[post.text] = error
+
+        threads = [threading.Thread(target=save, args=[post])
+                   for post in posts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def test_concurrent_posts_get_their_ids(self):
+        """Каждый поток получает id своего поста, счетчики верны."""
+        batches = []
+        insert = self.batcher._insert
+        self.batcher._insert = lambda posts: (
+            batches.append(len(posts)), insert(posts))
+        posts = [Post(author=author, text=f'Пост {author.username}')
+                 for author in self.authors]
+        self.assertEqual(self.save_concurrently(posts), {})
+        self.assertGreater(max(batches), 1)
+        saved = dict(Post.objects.values_list('pk', 'text'))
+        self.assertEqual(saved, {post.pk: post.text for post in posts})
+        self.assertEqual(
+            list(PostCounter.objects.values_list('posts_count', flat=True)),
+            [1] * self.threads)
+        self.assertEqual(posts[0].excerpt, posts[0].text)
+
+    def test_bad_post_fails_alone(self):
+        """Ошибка одного поста не теряет остальные посты пачки."""
+        posts = [Post(author=author, text=f'Пост {author.username}')
+                 for author in self.authors]
+        posts.append(Post(author_id=10 ** 6, text='Без автора'))
+        errors = self.save_concurrently(posts)
+        self.assertEqual(list(errors), ['Без автора'])
+        self.assertEqual(Post.objects.count(), self.threads)
+
+    @override_settings(POST_BATCH_ENABLED=True)
+    def test_post_create_uses_batcher(self):
+        """post_create с групповой записью ведет в профиль и сбрасывает
+        ленты."""
+        self.addCleanup(batcher.stop)
+        client = Client()
+        client.force_login(self.authors[0])
+        index = reverse('posts:index')
+        Client().get(index)
+        response = client.post(reverse('posts:post_create'),
+                               {'text': 'Пост через очередь'})
+        self.assertRedirects(response, reverse(
+            'posts:profile', kwargs={'username': 'writer0'}))
+        self.assertTrue(Post.objects.filter(
+            text='Пост через очередь').exists())
+        self.assertContains(Client().get(index), 'Пост через очередь')
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from posts.benchmarks.views import SCENARIOS
+
+
+class BenchmarkViewsCommandTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.baseline = os.path.join(directory.name, 'baseline.json')
+
+    def benchmark(self, *args):
+        call_command('benchmark_views', '--use-current-db', '--sizes=20,60',
+                     '--repeat=1', f'--baseline={self.baseline}', *args,
+                     stdout=StringIO())
+
+    def test_measures_every_view_at_every_size(self):
+        """Замер есть для каждого сценария и размера базы."""
+        self.benchmark('--save-baseline')
+        with open(self.baseline) as baseline_file:
+            results = json.load(baseline_file)
+
+        self.assertEqual(list(results), ['20', '60'])
+        for size, scenarios in results.items():
+            self.assertEqual(set(scenarios),
+                             {scenario[0] for scenario in SCENARIOS})
+            for name, result in scenarios.items():
+                with self.subTest(size=size, view=name):
+                    self.assertLess(result['status'], 400)
+                    self.assertGreater(result['time_ms'], 0)
+                    self.assertGreater(result['peak_kb'], 0)
+
+    def test_extra_queries_fail_against_baseline(self):
+        """Лишние запросы относительно baseline -- ошибка команды."""
+        with open(self.baseline, 'w') as baseline_file:
+            json.dump({'20': {'index': {
+                'queries': 0, 'time_ms': 1e6, 'peak_kb': 1e6}}},
+                baseline_file)
+
+        with self.assertRaisesMessage(CommandError, '20/index: запросов'):
+            self.benchmark('--scenario=index')
+
+    def test_baseline_is_opt_in(self):
+        """Без --baseline замер ни с чем не сравнивается."""
+        call_command('benchmark_views', '--use-current-db', '--sizes=20',
+                     '--repeat=1', '--scenario=index', stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, 'нужен --baseline'):
+            call_command('benchmark_views', '--use-current-db',
+                         '--sizes=20', '--save-baseline', stdout=StringIO())
+
+    def test_server_caches_are_untouched(self):
+        """Замер не очищает кеши сервера и не пишет в них; --repeat
+        меньше 1 -- ошибка."""
+        for alias in settings.CACHES:
+            caches[alias].set('server', alias)
+        call_command('benchmark_views', '--use-current-db', '--sizes=20',
+                     '--repeat=1', '--scenario=index', stdout=StringIO())
+        for alias in settings.CACHES:
+            with self.subTest(alias=alias):
+                self.assertEqual(caches[alias].get('server'), alias)
+
+        with self.assertRaisesMessage(CommandError, '--repeat'):
+            call_command('benchmark_views', '--use-current-db',
+                         '--sizes=20', '--repeat=0', stdout=StringIO())
@@ -0,0 +1,388 @@
+import threading
+import time
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from posts import versions
+from posts.models import Group, Post
+from posts.page_cache import page_cache_stats, single_flight
+from posts.tests.utils import commit_callbacks
+
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора, группу и пост для проверки кеша карточек."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='card_author', first_name='Иван', last_name='Иванов')
+        cls.group = Group.objects.create(
+            title='card group',
+            slug='card-group',
+            description='card group description',
+        )
+        cls.post = Post.objects.create(
+            text='Исходный текст', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.feeds = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        ]
+
+    def assert_feeds_contain(self, text):
+        for url in self.feeds:
+            with self.subTest(url=url):
+                self.assertContains(self.guest_client.get(url), text)
+
+    def test_cards_are_served_from_cache(self):
+        """Карточка берется из кеша, а не рендерится заново."""
+        self.assert_feeds_contain('Исходный текст')
+        # Запись в обход ORM не меняет версию поста.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE posts_post SET text = %s, excerpt = %s '
+                'WHERE id = %s', ['Тихая правка', 'Тихая правка',
+                                  self.post.pk])
+        self.assert_feeds_contain('Исходный текст')
+
+    def test_queryset_update_invalidates_card(self):
+        """update() обновляет карточку и ленты, как и save()."""
+        self.assert_feeds_contain('Исходный текст')
+        with commit_callbacks():
+            Post.objects.filter(pk=self.post.pk).update(text='Правка пачкой')
+        self.assert_feeds_contain('Правка пачкой')
+
+    def test_post_edit_invalidates_card(self):
+        """Правка поста через post_edit обновляет карточку."""
+        self.assert_feeds_contain('Исходный текст')
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Новый текст', 'group': self.group.pk})
+        self.assert_feeds_contain('Новый текст')
+
+    def test_group_reslug_invalidates_card(self):
+        """Смена slug группы обновляет ссылку в карточке."""
+        index = reverse('posts:index')
+        self.assertContains(self.guest_client.get(index), 'card-group')
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'new-card-group'
+        group.save()
+        self.assertContains(self.guest_client.get(index), 'new-card-group')
+
+    def test_author_rename_invalidates_card(self):
+        """Смена имени автора обновляет карточку, вход -- нет."""
+        self.assert_feeds_contain('Иван Иванов')
+        version_key = versions.author_key(self.author.pk)
+        version = cache.get(version_key)
+        self.client.force_login(self.author)
+        self.assertEqual(cache.get(version_key), version)
+
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Петр'
+        author.save()
+        self.assert_feeds_contain('Петр Иванов')
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора, группу и пост для проверки кеша страниц."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='page_author')
+        cls.group = Group.objects.create(
+            title='page group',
+            slug='page-group',
+            description='page group description',
+        )
+        cls.post = Post.objects.create(
+            text='Первый пост', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.feeds = {
+            'index': reverse('posts:index'),
+            'group_posts': reverse('posts:group_posts',
+                                   kwargs={'slug': self.group.slug}),
+            'profile': reverse('posts:profile',
+                               kwargs={'username': self.author.username}),
+        }
+
+    def test_second_anonymous_request_is_served_from_cache(self):
+        """Повторный анонимный запрос не ходит в базу
+        и считается попаданием."""
+        for feed, url in self.feeds.items():
+            with self.subTest(feed=feed):
+                first = self.guest_client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.guest_client.get(url)
+                self.assertEqual(second.content, first.content)
+                self.assertEqual(page_cache_stats()[feed],
+                                 {'hits': 1, 'stale': 0, 'misses': 1})
+
+    def test_new_author_or_group_keeps_feeds_cached(self):
+        """Регистрация автора и новая группа не сбрасывают ленты."""
+        url = self.feeds['index']
+        self.guest_client.get(url)
+        User.objects.create_user(username='signup_author')
+        Group.objects.create(title='fresh group', slug='fresh-group',
+                             description='fresh group description')
+        with self.assertNumQueries(0):
+            self.guest_client.get(url)
+
+    def test_authenticated_requests_bypass_cache(self):
+        """Авторизованные пользователи получают страницу без кеша."""
+        url = self.feeds['index']
+        self.author_client.get(url)
+        self.author_client.get(url)
+        self.assertEqual(page_cache_stats()['index'],
+                         {'hits': 0, 'stale': 0, 'misses': 0})
+
+    def test_post_create_and_delete_invalidate_feeds(self):
+        """Создание и удаление поста сразу сбрасывают его ленты."""
+        for url in self.feeds.values():
+            self.guest_client.get(url)
+        self.author_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Свежий пост', 'group': self.group.pk})
+        for feed, url in self.feeds.items():
+            with self.subTest(feed=feed):
+                self.assertContains(self.guest_client.get(url), 'Свежий пост')
+
+        Post.objects.filter(text='Свежий пост').delete()
+        for feed, url in self.feeds.items():
+            with self.subTest(feed=feed):
+                self.assertNotContains(self.guest_client.get(url),
+                                       'Свежий пост')
+
+    def test_bulk_create_and_update_invalidate_feeds(self):
+        """bulk_create и update сбрасывают ленты, как и сигналы
+        save и delete."""
+        for url in self.feeds.values():
+            self.guest_client.get(url)
+        with commit_callbacks():
+            Post.objects.bulk_create([Post(
+                text='Пост пачкой', author=self.author, group=self.group)])
+        for feed, url in self.feeds.items():
+            with self.subTest(feed=feed):
+                self.assertContains(self.guest_client.get(url), 'Пост пачкой')
+
+        other = Group.objects.create(title='other', slug='other-page-group',
+                                     description='other')
+        other_url = reverse('posts:group_posts', kwargs={'slug': other.slug})
+        self.guest_client.get(other_url)
+        with commit_callbacks():
+            Post.objects.filter(text='Пост пачкой').update(group=other)
+        self.assertNotContains(
+            self.guest_client.get(self.feeds['group_posts']), 'Пост пачкой')
+        self.assertContains(self.guest_client.get(other_url), 'Пост пачкой')
+
+    def test_bulk_writes_invalidate_after_commit(self):
+        """bulk_create и update меняют метки лент только после COMMIT:
+        читатель до него не закеширует старые строки под новой меткой."""
+        key = versions.feed_key('index')
+        stamp = versions.get_versions([key])[key]
+        with commit_callbacks():
+            with transaction.atomic():
+                Post.objects.bulk_create([Post(text='До коммита',
+                                               author=self.author)])
+                Post.objects.filter(text='До коммита').update(
+                    text='Все еще до коммита')
+                self.assertEqual(cache.get(key), stamp)
+            self.assertEqual(cache.get(key), stamp)
+        self.assertNotEqual(cache.get(key), stamp)
+
+    def test_unknown_query_params_share_cache_entry(self):
+        """Посторонние параметры запроса не заводят новых записей."""
+        url = self.feeds['index']
+        for number in range(3):
+            self.guest_client.get(url, {'x': number})
+        self.assertEqual(page_cache_stats()['index'],
+                         {'hits': 2, 'stale': 0, 'misses': 1})
+        self.guest_client.get(url, {'page': 1})
+        self.assertEqual(page_cache_stats()['index']['misses'], 2)
+
+    def test_metrics_endpoint_reports_counters(self):
+        """Счетчики кеша доступны на /metrics/ только локально."""
+        self.guest_client.get(self.feeds['index'])
+        self.guest_client.get(self.feeds['index'])
+
+        response = self.guest_client.get(reverse('metrics'))
+        self.assertContains(
+            response, 'yatube_page_cache_hits_total{view="index"} 1')
+        self.assertContains(
+            response, 'yatube_page_cache_misses_total{view="index"} 1')
+
+        response = self.guest_client.get(reverse('metrics'),
+                                         REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class SingleFlightTests(SimpleTestCase):
+    threads_count = 10
+
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+        self.calls_lock = threading.Lock()
+
+    def slow_compute(self):
+        with self.calls_lock:
+            self.calls += 1
+        time.sleep(0.2)
+        return 'свежая страница'
+
+    def run_concurrently(self, key):
+        """Запускает single_flight из нескольких потоков одновременно."""
+        results = [None] * self.threads_count
+        barrier = threading.Barrier(self.threads_count)
+
+        def worker(number):
+            barrier.wait()
+            results[number] = single_flight(
+                key, self.slow_compute, fresh_timeout=60, timeout=60,
+                lock_timeout=5)
+
+        threads = [threading.Thread(target=worker, args=(number,))
+                   for number in range(self.threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_misses_compute_once(self):
+        """При промахе страницу считает один поток, остальные ждут его."""
+        results = self.run_concurrently('page:test')
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual({value for value, event in results},
+                         {'свежая страница'})
+        self.assertEqual(
+            sorted(event for value, event in results),
+            ['hits'] * (self.threads_count - 1) + ['misses'])
+
+    def test_stale_value_is_served_during_recompute(self):
+        """Устаревшую страницу отдают всем, пока один поток ее обновляет."""
+        cache.set('page:test', {'value': 'старая страница',
+                                'fresh_until': time.time() - 1})
+
+        results = self.run_concurrently('page:test')
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(
+            sorted(results),
+            [('свежая страница', 'misses')]
+            + [('старая страница', 'stale')] * (self.threads_count - 1))
+        self.assertEqual(cache.get('page:test')['value'], 'свежая страница')
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора, группу и пост для проверки условных запросов."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='etag_author')
+        cls.group = Group.objects.create(
+            title='etag group',
+            slug='etag-group',
+            description='etag group description',
+        )
+        cls.post = Post.objects.create(
+            text='Пост с ETag', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.pages = {
+            'index': reverse('posts:index'),
+            'group_posts': reverse('posts:group_posts',
+                                   kwargs={'slug': self.group.slug}),
+            'profile': reverse('posts:profile',
+                               kwargs={'username': self.author.username}),
+            'post_detail': reverse('posts:post_detail',
+                                   kwargs={'post_id': self.post.pk}),
+        }
+
+    def test_if_none_match_returns_not_modified(self):
+        """Совпавший ETag дает 304 без рендеринга шаблона."""
+        for page, url in self.pages.items():
+            with self.subTest(page=page):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+                self.assertFalse(response.templates)
+
+    def wait_next_second(self):
+        time.sleep(1 - time.time() % 1)
+
+    def test_if_modified_since_returns_not_modified(self):
+        """Неизменившаяся страница отвечает 304 на If-Modified-Since."""
+        for url in self.pages.values():
+            self.guest_client.get(url)
+        self.wait_next_second()
+        for page, url in self.pages.items():
+            with self.subTest(page=page):
+                last_modified = self.guest_client.get(url)['Last-Modified']
+                response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+
+    def test_no_last_modified_within_second_of_change(self):
+        """Пока не кончилась секунда правки, Last-Modified не
+        отдается: вторая правка в ту же секунду не даст ложный 304."""
+        url = self.pages['post_detail']
+        self.guest_client.get(url)
+        self.wait_next_second()
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        self.post.text = 'Первая правка'
+        self.post.save()
+        response = self.guest_client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertTrue(response.has_header('ETag'))
+
+        self.post.text = 'Вторая правка'
+        self.post.save()
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertContains(response, 'Вторая правка')
+
+    def test_new_post_changes_etag(self):
+        """Новый пост автора меняет ETag лент и страницы поста."""
+        etags = {page: self.guest_client.get(url)['ETag']
+                 for page, url in self.pages.items()}
+        self.author_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Еще пост', 'group': self.group.pk})
+        for page, url in self.pages.items():
+            with self.subTest(page=page):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[page])
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_depends_on_user(self):
+        """Гость и автор получают разные ETag одной страницы."""
+        url = self.pages['post_detail']
+        self.assertNotEqual(self.guest_client.get(url)['ETag'],
+                            self.author_client.get(url)['ETag'])
@@ -0,0 +1,115 @@
+import csv
+import json
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.export import export_rows
+from posts.models import Group, Post
+
+
+User = get_user_model()
+
+
+class PostExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора с постами, постороннего и сотрудника."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='export_author')
+        cls.stranger = User.objects.create_user(username='export_stranger')
+        cls.staff = User.objects.create_user(username='export_staff',
+                                             is_staff=True)
+        cls.group = Group.objects.create(
+            title='export group',
+            slug='export-group',
+            description='export group description',
+        )
+        Post.objects.bulk_create(
+            [Post(author=cls.author, group=cls.group, text=f'Пост, "{n}"')
+             for n in range(7)])
+        Post.objects.create(author=cls.stranger, text='Чужой пост')
+        cls.author_ids = list(cls.author.posts.order_by('id').values_list(
+            'id', flat=True))
+
+    def setUp(self):
+        self.export_url = reverse(
+            'posts:profile_export', kwargs={'username': self.author.username})
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def test_rows_are_read_in_chunks(self):
+        """Выгрузка идет пачками по id одинаковым числом запросов."""
+        with self.assertNumQueries(3):
+            rows = list(export_rows(self.author.posts.all(), chunk_size=3))
+        self.assertEqual([row['id'] for row in rows], self.author_ids)
+        self.assertEqual(rows[0]['author'], 'export_author')
+        self.assertEqual(rows[0]['group'], 'export-group')
+
+    def test_command_exports_jsonl_and_resumes(self):
+        """Команда пишет JSONL и продолжает выгрузку после --after."""
+        out = StringIO()
+        call_command('export_posts', '--chunk-size=2', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), Post.objects.count())
+
+        out = StringIO()
+        call_command('export_posts', '--author=export_author',
+                     f'--after={self.author_ids[3]}', stdout=out)
+        resumed = [json.loads(line)['id']
+                   for line in out.getvalue().splitlines()]
+        self.assertEqual(resumed, self.author_ids[4:])
+
+    def test_chunk_size_must_be_positive(self):
+        """Пачка из 0 строк -- ошибка, а не IndexError посреди выгрузки."""
+        with self.assertRaises(ValueError):
+            export_rows(chunk_size=0)
+        with self.assertRaisesMessage(CommandError, '--chunk-size'):
+            call_command('export_posts', '--chunk-size=0', stdout=StringIO())
+
+    def test_author_downloads_csv(self):
+        """Автор получает потоковую CSV-выгрузку своих постов."""
+        response = self.client_for(self.author).get(
+            self.export_url, {'format': 'csv'})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([int(row['id']) for row in rows], self.author_ids)
+        self.assertEqual(rows[0]['text'], 'Пост, "0"')
+
+    def test_resumed_csv_has_no_header(self):
+        """Продолжение CSV склеивается с началом в один файл."""
+        client = self.client_for(self.author)
+        first = b''.join(client.get(
+            self.export_url, {'format': 'csv'}).streaming_content).decode()
+        head = first.splitlines(keepends=True)[:5]
+        after = int(head[-1].split(',', 1)[0])
+        rest = b''.join(client.get(
+            self.export_url, {'format': 'csv', 'after': after},
+        ).streaming_content).decode()
+        rows = list(csv.DictReader(StringIO(''.join(head) + rest)))
+        self.assertEqual([int(row['id']) for row in rows], self.author_ids)
+
+    def test_export_access(self):
+        """Выгружать может автор и сотрудник, остальным отказ."""
+        cases = (
+            (Client(), HTTPStatus.FOUND),
+            (self.client_for(self.stranger), HTTPStatus.FORBIDDEN),
+            (self.client_for(self.staff), HTTPStatus.OK),
+        )
+        for client, status in cases:
+            with self.subTest(status=status):
+                self.assertEqual(client.get(self.export_url).status_code,
+                                 status)
+        response = self.client_for(self.author).get(
+            self.export_url, {'format': 'xml'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
@@ -0,0 +1,136 @@
+import json
+import os
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, PostCounter
+from posts.search import search
+from posts.tests.utils import commit_callbacks
+
+
+User = get_user_model()
+
+
+class ImportPostsCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора с постом и группу, известные до загрузки."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='import_author')
+        cls.group = Group.objects.create(
+            title='import group',
+            slug='import-group',
+            description='import group description',
+        )
+        Post.objects.create(author=cls.author, text='Старый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def write_jsonl(self, rows):
+        source = tempfile.NamedTemporaryFile(
+            'w', suffix='.jsonl', delete=False, encoding='utf-8')
+        with source:
+            for row in rows:
+                source.write(row if isinstance(row, str)
+                             else json.dumps(row, ensure_ascii=False))
+                source.write('\n')
+        self.addCleanup(os.remove, source.name)
+        return source.name
+
+    def import_rows(self, rows, *args):
+        out, err = StringIO(), StringIO()
+        call_command('import_posts', self.write_jsonl(rows),
+                     '--batch-size=3', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_imports_posts_with_dates_counters_and_search(self):
+        """Посты загружаются с датой из файла, счетчиком и поиском."""
+        rows = [{'author': 'import_author', 'group': 'import-group',
+                 'text': f'загруженный котик {number}',
+                 'pub_date': f'2020-01-0{number + 1}T10:00:00+00:00'}
+                for number in range(7)]
+        out, _ = self.import_rows(rows)
+
+        self.assertIn('Загружено постов: 7', out)
+        imported = Post.objects.filter(group=self.group).order_by('pub_date')
+        self.assertEqual(imported.count(), 7)
+        self.assertEqual(imported[0].pub_date.isoformat(),
+                         '2020-01-01T10:00:00+00:00')
+        self.assertEqual(PostCounter.objects.posts_count(self.author.pk), 8)
+        self.assertEqual(len(search(Post.objects.all(), 'загруженный')), 7)
+
+    def test_unknown_authors_are_skipped_or_created(self):
+        """Неизвестных авторов пропускаем, с --create-missing создаем."""
+        rows = [{'author': 'new_author', 'group': 'new-group',
+                 'text': 'Пост нового автора'}, 'не json']
+        out, err = self.import_rows(rows)
+        self.assertIn('пропущено строк: 2', out)
+        self.assertIn('строка 2', err)
+        self.assertFalse(User.objects.filter(username='new_author').exists())
+
+        out, _ = self.import_rows(rows, '--create-missing')
+        author = User.objects.get(username='new_author')
+        self.assertFalse(author.has_usable_password())
+        self.assertTrue(Group.objects.filter(slug='new-group').exists())
+        self.assertEqual(PostCounter.objects.posts_count(author.pk), 1)
+
+    def test_import_refreshes_cached_feeds(self):
+        """Загрузка меняет ETag лент автора, группы и главной."""
+        client = Client()
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        ]
+        etags = {url: client.get(url)['ETag'] for url in urls}
+        with commit_callbacks():
+            self.import_rows([{'author': 'import_author',
+                               'group': 'import-group',
+                               'text': 'Пост из файла'}])
+        for url in urls:
+            with self.subTest(url=url):
+                response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, 'Пост из файла')
+
+    def test_non_string_author_or_group_is_skipped(self):
+        """author и group не строками -- ошибка строки, а не всей
+        загрузки."""
+        rows = [{'author': ['import_author'], 'text': 'список'},
+                {'author': 'import_author', 'group': {'slug': 'x'},
+                 'text': 'словарь'},
+                {'author': 'import_author', 'text': 'нормальный'}]
+        out, err = self.import_rows(rows)
+        self.assertIn('Загружено постов: 1', out)
+        self.assertIn('строка 1', err)
+        self.assertIn('строка 2', err)
+
+    def test_strict_mode_stops_on_error(self):
+        """В строгом режиме ошибочная строка останавливает загрузку."""
+        rows = [{'author': 'import_author', 'text': 'первый'}, '{}']
+        with self.assertRaisesMessage(CommandError, 'строка 2'):
+            self.import_rows(rows, '--strict')
+
+    def test_unreadable_file_stops_import(self):
+        """Ошибка декодирования файла -- ошибка команды, а не одна
+        пропущенная строка."""
+        path = self.write_jsonl(
+            [{'author': 'import_author', 'text': 'до ошибки'}])
+        with open(path, 'ab') as source:
+            source.write(b'{"author": "import_author", "text": "\xff"}\n')
+        for args in ((), ('--strict',)):
+            with self.subTest(args=args):
+                with self.assertRaisesMessage(CommandError,
+                                              'Загрузка прервана'):
+                    call_command('import_posts', path, *args,
+                                 stdout=StringIO(), stderr=StringIO())
@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TransactionTestCase
+
+from posts.models import Post
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.output = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+        self.output.close()
+        self.addCleanup(os.remove, self.output.name)
+
+    def run_loadtest(self, *args):
+        call_command(
+            'loadtest', '--users=5', '--groups=2',
+            '--posts=50', '--requests=40', '--concurrency=2',
+            f'--output={self.output.name}', *args, stdout=StringIO())
+        with open(self.output.name) as output:
+            return json.load(output)
+
+    def test_reports_percentiles_by_route(self):
+        """Прогон пишет по маршрутам число запросов и перцентили.
+
+        Прогон идет во временной файловой базе: в общей базе в памяти
+        SQLite сразу падает на параллельной записи ("table is locked"),
+        а текущая база и ее кеши не меняются.
+        """
+        posts_before = Post.objects.count()
+        results = self.run_loadtest()
+
+        self.assertEqual(
+            sum(route['count'] for route in results['routes'].values()), 40)
+        for name, route in results['routes'].items():
+            with self.subTest(route=name):
+                self.assertEqual(route['errors'], 0)
+                self.assertLessEqual(route['p50_ms'], route['p95_ms'])
+                self.assertLessEqual(route['p95_ms'], route['p99_ms'])
+        self.assertEqual(Post.objects.count(), posts_before)
+
+    def test_baseline_regression_fails(self):
+        """Рост p95 относительно baseline завершает команду ошибкой."""
+        baseline = {'routes': {'index': {'p95_ms': 0.0001}}}
+        with open(self.output.name, 'w') as output:
+            json.dump(baseline, output)
+        baseline_file = self.output.name + '.baseline'
+        os.replace(self.output.name, baseline_file)
+        self.addCleanup(os.remove, baseline_file)
+
+        with self.assertRaisesMessage(CommandError, 'index'):
+            self.run_loadtest(f'--baseline={baseline_file}')
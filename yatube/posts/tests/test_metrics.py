@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import REQUEST_DURATION
+from core.sql_fingerprints import fingerprint, stats
+from posts.models import Post
+
+
+User = get_user_model()
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='metrics_author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_server_timing_header(self):
+        """Ответ содержит Server-Timing с числом и временем запросов,
+        временем шаблонов и общим временем."""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="2 queries", tpl;dur=[\d.]+, '
+            r'total;dur=[\d.]+$')
+
+    def test_histograms_are_exposed(self):
+        """Гистограммы по имени URL доступны на /metrics/."""
+        self.guest_client.get(reverse('posts:post_detail',
+                                      args=[self.post.pk]))
+        metrics = self.guest_client.get(reverse('metrics')).content.decode()
+        for name in ('yatube_request_duration_seconds',
+                     'yatube_request_db_seconds',
+                     'yatube_request_template_seconds'):
+            with self.subTest(name=name):
+                self.assertIn(f'# TYPE {name} histogram', metrics)
+                count = re.search(
+                    rf'^{name}_count{{view="posts:post_detail"}} (\d+)$',
+                    metrics, re.M)
+                self.assertGreaterEqual(int(count.group(1)), 1)
+
+    def test_histograms_add_up_across_workers(self):
+        """/metrics/ отдает сумму наблюдений всех процессов."""
+        def worker():
+            REQUEST_DURATION.observe('test:workers', 0.2)
+            REQUEST_DURATION.flush()
+            os._exit(0)
+
+        process = multiprocessing.get_context('fork').Process(target=worker)
+        process.start()
+        process.join(10)
+        self.assertEqual(process.exitcode, 0)
+        REQUEST_DURATION.observe('test:workers', 0.003)
+
+        metrics = self.guest_client.get(reverse('metrics')).content.decode()
+        label = 'view="test:workers"'
+        for line in (f'yatube_request_duration_seconds_count{{{label}}} 2',
+                     f'yatube_request_duration_seconds_sum{{{label}}} 0.203',
+                     'yatube_request_duration_seconds_bucket'
+                     f'{{{label},le="0.005"}} 1',
+                     'yatube_request_duration_seconds_bucket'
+                     f'{{{label},le="0.25"}} 2'):
+            with self.subTest(line=line):
+                self.assertIn(line + '\n', metrics)
+
+    @override_settings(PERFORMANCE_METRICS_ENABLED=False)
+    def test_middleware_can_be_disabled(self):
+        """Без PERFORMANCE_METRICS_ENABLED заголовка нет."""
+        response = Client().get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+
+class FingerprintTests(SimpleTestCase):
+    def test_fingerprint_strips_literals(self):
+        """Литералы и параметры заменяются, списки IN сворачиваются."""
+        self.assertEqual(
+            fingerprint('SELECT "a" FROM "t" WHERE "id" IN (%s, %s, %s) '
+                        "AND  \"name\" = 'x''y' LIMIT 21"),
+            'SELECT "a" FROM "t" WHERE "id" IN (...) '
+            'AND "name" = ? LIMIT ?')
+
+
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='slow_author')
+        Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        stats.reset()
+        self.stats_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.stats_dir)
+        self.guest_client = Client()
+
+    def test_queries_are_aggregated_by_view(self):
+        """Запросы view попадают в статистику под его именем, а
+        top_queries выводит их из сброшенных файлов."""
+        url = reverse('posts:profile',
+                      kwargs={'username': self.author.username})
+        self.guest_client.get(url)
+        # Автор берется из кеша -- без очистки второй запрос его не ищет.
+        cache.clear()
+        self.guest_client.get(url, {'page': 2})
+
+        entries = [entry for entry in stats.snapshot()
+                   if entry['view'] == 'posts:profile']
+        self.assertTrue(entries)
+        self.assertTrue(all(entry['count'] == 2 for entry in entries))
+
+        out = StringIO()
+        with self.settings(SQL_STATS_DIR=self.stats_dir):
+            stats.flush()
+            call_command('top_queries', limit=3, sort='count', stdout=out)
+        self.assertEqual(out.getvalue().count('posts:profile'), 3)
+
+    def test_flush_prunes_dead_processes(self):
+        """Сброс удаляет файлы завершившихся процессов; без
+        SQL_STATS_DIR файлов нет совсем."""
+        process = multiprocessing.get_context('fork').Process(
+            target=os._exit, args=(0,))
+        process.start()
+        process.join()
+        dead = os.path.join(self.stats_dir, f'{process.pid}.json')
+        with open(dead, 'w') as stats_file:
+            stats_file.write('[]')
+        with self.settings(SQL_STATS_DIR=self.stats_dir):
+            stats.flush()
+        self.assertEqual(os.listdir(self.stats_dir), [f'{os.getpid()}.json'])
+
+        with self.settings(SQL_STATS_DIR=None):
+            stats.flush()
+            with self.assertRaisesMessage(CommandError,
+                                          'YATUBE_SQL_STATS_DIR'):
+                call_command('top_queries', stdout=StringIO())
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_queries_are_logged_with_origin(self):
+        """Медленный запрос пишется в лог с view и местом вызова."""
+        with self.assertLogs('yatube.slow_queries', 'WARNING') as logs:
+            self.guest_client.get(reverse('posts:index'))
+        self.assertIn('posts:index', logs.output[0])
+        self.assertIn('posts/', logs.output[0])
@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.models import EXCERPT_LENGTH, Group, Post, PostCounter, make_excerpt
 
 
 User = get_user_model()
@@ -37,3 +40,102 @@ class TaskModelTest(TestCase):
         group = TaskModelTest.group
         expected_object_name = group.title
         self.assertEqual(expected_object_name, str(group))
+
+
+class PostCounterTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Создаем двух авторов и три поста первого автора."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='counter_author')
+        cls.other = User.objects.create_user(username='counter_other')
+        for post_number in range(3):
+            Post.objects.create(author=cls.author, text=f'Пост {post_number}')
+
+    def posts_count(self, author):
+        return PostCounter.objects.get(author=author).posts_count
+
+    def test_counter_follows_create_and_delete(self):
+        """Счетчик растет при создании и уменьшается при удалении."""
+        self.assertEqual(self.posts_count(self.author), 3)
+        Post.objects.filter(author=self.author).first().delete()
+        self.assertEqual(self.posts_count(self.author), 2)
+        Post.objects.filter(author=self.author).delete()
+        self.assertEqual(self.posts_count(self.author), 0)
+
+    def test_counter_follows_author_reassignment(self):
+        """Смена автора через save и update переносит счетчик."""
+        post = Post.objects.filter(author=self.author).first()
+        post.author = self.other
+        post.save()
+        self.assertEqual(self.posts_count(self.author), 2)
+        self.assertEqual(self.posts_count(self.other), 1)
+
+        Post.objects.filter(author=self.author).update(author=self.other)
+        self.assertEqual(self.posts_count(self.author), 0)
+        self.assertEqual(self.posts_count(self.other), 3)
+
+    def test_counter_follows_bulk_create(self):
+        """bulk_create увеличивает счетчики авторов."""
+        Post.objects.bulk_create(
+            [Post(author=self.other, text='bulk') for _ in range(4)])
+        self.assertEqual(self.posts_count(self.other), 4)
+
+    def test_recount_posts_repairs_drift(self):
+        """recount_posts чинит разошедшиеся и создает недостающие."""
+        PostCounter.objects.filter(author=self.author).update(posts_count=42)
+        PostCounter.objects.filter(author=self.other).delete()
+        out = StringIO()
+
+        call_command('recount_posts', batch_size=1, stdout=out)
+
+        self.assertEqual(self.posts_count(self.author), 3)
+        self.assertEqual(self.posts_count(self.other), 0)
+        self.assertIn('исправлено счетчиков: 1', out.getvalue())
+
+
+class PostTextHtmlTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Создаем автора для постов с разметкой в тексте."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='html_author')
+
+    def test_html_is_rendered_on_save_and_bulk_create(self):
+        """HTML текста считается при сохранении и в bulk_create."""
+        post = Post.objects.create(author=self.author, text='<b>a</b>\nb')
+        self.assertEqual(post.text_html, '&lt;b&gt;a&lt;/b&gt;<br>b')
+
+        post.text = 'c\nd'
+        post.save()
+        self.assertEqual(Post.objects.get(pk=post.pk).text_html, 'c<br>d')
+
+        Post.objects.bulk_create([Post(author=self.author, text='e\nf')])
+        self.assertEqual(
+            Post.objects.get(text='e\nf').text_html, 'e<br>f')
+
+    def test_backfill_command(self):
+        """render_post_html заполняет HTML у старых строк."""
+        post = Post.objects.create(author=self.author, text='g\nh')
+        Post.objects.filter(pk=post.pk).update(text_html='')
+        self.assertEqual(Post.objects.get(pk=post.pk).body_html, 'g<br>h')
+
+        call_command('render_post_html', stdout=StringIO())
+        self.assertEqual(Post.objects.get(pk=post.pk).text_html, 'g<br>h')
+
+
+class PostExcerptTest(TestCase):
+    def test_make_excerpt(self):
+        """Анонс обрезается по границе слова и помечается многоточием."""
+        self.assertEqual(make_excerpt('коротко'), 'коротко')
+        self.assertEqual(make_excerpt('раз два три', length=9), 'раз два…')
+        self.assertEqual(make_excerpt('оченьдлинноеслово', length=5),
+                         'очень…')
+
+    def test_excerpt_follows_text(self):
+        """Анонс пересчитывается при изменении текста."""
+        author = User.objects.create_user(username='excerpt_model_author')
+        post = Post.objects.create(author=author, text='x' * 400)
+        self.assertEqual(len(post.excerpt), EXCERPT_LENGTH + 1)
+        Post.objects.filter(pk=post.pk).update(text='новый текст')
+        self.assertEqual(Post.objects.get(pk=post.pk).excerpt, 'новый текст')
@@ -0,0 +1,184 @@
+import time
+import warnings
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Group, Post
+from posts.utils import PostPaginator, encode_cursor
+
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Создаем 25 тестовых постов для keyset-пагинации."""
+        super().setUpClass()
+        cls.count_post = settings.POSTS_PER_PAGE * 2 + 5
+        cls.author = User.objects.create_user(username='cursor_author')
+        cls.group = Group.objects.create(
+            title='cursor group',
+            slug='cursor-group',
+            description='cursor group description',
+        )
+        for post_number in range(cls.count_post):
+            Post.objects.create(
+                text=f'Cursor post {post_number}',
+                author=cls.author,
+                group=cls.group,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        ]
+
+    def walk(self, url, cursor_name='next_cursor'):
+        """Проходит страницы по курсорам и собирает id постов."""
+        ids = []
+        cursor = ''
+        while cursor is not None:
+            response = self.guest_client.get(url, {'cursor': cursor})
+            page_obj = response.context['page_obj']
+            ids.append([post.id for post in page_obj])
+            cursor = getattr(page_obj, cursor_name)
+        return ids
+
+    def test_cursor_pages_cover_all_posts_in_order(self):
+        """Курсоры проходят все посты в порядке Post.Meta.ordering."""
+        expected = list(Post.objects.values_list('id', flat=True))
+        for url in self.urls:
+            with self.subTest(url=url):
+                pages = self.walk(url)
+                self.assertEqual(
+                    [len(page) for page in pages],
+                    [settings.POSTS_PER_PAGE, settings.POSTS_PER_PAGE, 5])
+                self.assertEqual(sum(pages, []), expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает ту же страницу, что была до этого."""
+        url = reverse('posts:index')
+        first = self.guest_client.get(url, {'cursor': ''})
+        second = self.guest_client.get(
+            url, {'cursor': first.context['page_obj'].next_cursor})
+        back = self.guest_client.get(
+            url, {'cursor': second.context['page_obj'].previous_cursor})
+
+        self.assertEqual(list(back.context['page_obj']),
+                         list(first.context['page_obj']))
+        self.assertFalse(back.context['page_obj'].has_previous())
+        self.assertTrue(second.context['page_obj'].has_previous())
+
+    def test_cursor_mode_does_not_count_or_offset(self):
+        """В режиме курсора нет COUNT(*) и OFFSET."""
+        url = reverse('posts:index')
+        first = self.guest_client.get(url, {'cursor': ''})
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(
+                url, {'cursor': first.context['page_obj'].next_cursor})
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('OFFSET', query['sql'])
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый курсор отдает первую страницу."""
+        response = self.guest_client.get(reverse('posts:index'),
+                                         {'cursor': 'not-a-cursor'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj[0], Post.objects.first())
+        self.assertFalse(page_obj.has_previous())
+
+    def test_forged_cursor_returns_first_page(self):
+        """Курсор с чужими типами значений отдает первую страницу,
+        а не 500."""
+        forged = [
+            ['n', '2020-01-01T00:00:00', 'abc'],
+            ['n', '2020-01-01T00:00:00', {'id': 1}],
+            ['n', '2020-01-01T00:00:00', 10 ** 30],
+            ['n', '2020-13-01T00:00:00', 1],
+            ['n', None, 1],
+        ]
+        first_id = Post.objects.first().pk
+        for values in forged:
+            cursor = encode_cursor(values)
+            for url in (reverse('posts:index'), reverse('api:posts')):
+                with self.subTest(values=values, url=url):
+                    response = self.guest_client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+                    if response.context is None:
+                        first = response.json()['results'][0]['id']
+                    else:
+                        first = response.context['page_obj'][0].pk
+                    self.assertEqual(first, first_id)
+
+    def test_naive_cursor_date_is_made_aware(self):
+        """Дата курсора без зоны читается в текущей зоне без
+        RuntimeWarning."""
+        post = Post.objects.first()
+        naive = timezone.make_naive(post.pub_date).isoformat()
+        cursor = encode_cursor(['n', naive, post.pk])
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            response = self.guest_client.get(reverse('posts:index'),
+                                             {'cursor': cursor})
+        self.assertEqual(response.context['page_obj'][0],
+                         Post.objects.all()[1])
+
+
+class ElidedPageRangeTests(SimpleTestCase):
+    def render_page(self, num_pages, number):
+        paginator = PostPaginator(range(num_pages * settings.POSTS_PER_PAGE),
+                                  settings.POSTS_PER_PAGE)
+        return render_to_string('includes/paginator.html',
+                                {'page_obj': paginator.page(number)})
+
+    def best_render_time(self, num_pages, repeat=20):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            self.render_page(num_pages, num_pages // 2)
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    def test_elided_page_range(self):
+        """Первая и последняя страницы, соседи текущей и многоточия."""
+        paginator = PostPaginator(range(500), 10)
+        ellipsis = PostPaginator.ELLIPSIS
+        cases = {
+            1: [1, 2, 3, ellipsis, 50],
+            5: [1, 2, 3, 4, 5, 6, 7, ellipsis, 50],
+            25: [1, ellipsis, 23, 24, 25, 26, 27, ellipsis, 50],
+            50: [1, ellipsis, 48, 49, 50],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(paginator.get_elided_page_range(number)), expected)
+        self.assertEqual(
+            list(PostPaginator(range(30), 10).get_elided_page_range(2)),
+            [1, 2, 3])
+
+    def test_render_cost_is_flat_in_page_count(self):
+        """Бенчмарк: размер и время отрисовки не растут с числом страниц."""
+        small = self.render_page(10, 5)
+        huge = self.render_page(50000, 25000)
+        self.assertEqual(huge.count('<li'), small.count('<li'))
+
+        small_time = self.best_render_time(10)
+        huge_time = self.best_render_time(50000)
+        self.assertLess(huge_time, small_time * 5)
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections, router
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core import db_router
+from posts.models import Post
+
+User = get_user_model()
+
+ALIAS = 'replica'
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Основная база в памяти и ее копия-реплика в файле."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        connections.databases[ALIAS] = {
+            **connections.databases['default'],
+            'NAME': os.path.join(directory, 'replica.sqlite3'),
+            'PRAGMAS': {**settings.SQLITE_PRAGMAS,
+                        'journal_mode': 'DELETE', 'query_only': 'ON'},
+            'TEST': {},
+        }
+        self.addCleanup(connections.databases.pop, ALIAS)
+        self.addCleanup(self.close_connection)
+        replicas = override_settings(DATABASE_REPLICAS=[ALIAS])
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+        cache.clear()
+
+        self.author = User.objects.create_user(username='replica_author')
+        self.reader = User.objects.create_user(username='replica_reader')
+        self.old_post = Post.objects.create(author=self.author,
+                                            text='Пост в реплике')
+        self.refresh_replica()
+        self.new_post = Post.objects.create(author=self.author,
+                                            text='Пост только в основной')
+
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def refresh_replica(self):
+        call_command('refresh_replicas', stdout=StringIO())
+        # Тестовый клиент не проверяет соединения в начале запроса,
+        # поэтому соединение со старым файлом реплики закрываем сами.
+        connections[ALIAS].close()
+
+    def close_connection(self):
+        connections[ALIAS].close()
+        del connections[ALIAS]
+
+    def detail(self, post):
+        return reverse('posts:post_detail', kwargs={'post_id': post.pk})
+
+    def test_feed_views_read_replica(self):
+        """Страница поста и ленты читают с реплики, пока она не обновлена."""
+        profile = reverse('posts:profile',
+                          kwargs={'username': 'replica_author'})
+        self.assertEqual(self.guest_client.get(
+            self.detail(self.old_post)).status_code, HTTPStatus.OK)
+        self.assertEqual(self.guest_client.get(
+            self.detail(self.new_post)).status_code, HTTPStatus.NOT_FOUND)
+        self.assertNotContains(self.reader_client.get(profile),
+                               'Пост только в основной')
+
+        self.refresh_replica()
+        self.assertEqual(self.guest_client.get(
+            self.detail(self.new_post)).status_code, HTTPStatus.OK)
+        self.assertContains(self.reader_client.get(profile),
+                            'Пост только в основной')
+
+    def test_author_reads_primary_after_write(self):
+        """После записи автор читает основную базу, другие -- реплику."""
+        response = self.author_client.post(reverse('posts:post_create'),
+                                           {'text': 'Свежий пост'})
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        post = Post.objects.get(text='Свежий пост')
+        self.assertEqual(self.author_client.get(
+            self.detail(post)).status_code, HTTPStatus.OK)
+        self.assertEqual(self.reader_client.get(
+            self.detail(post)).status_code, HTTPStatus.NOT_FOUND)
+
+    def test_write_pins_rest_of_request(self):
+        """Первая запись переводит чтение до конца запроса в основную
+        базу."""
+        seen = []
+
+        def view(request):
+            seen.append(router.db_for_read(Post))
+            Post.objects.create(author=self.author, text='Из view')
+            seen.append(router.db_for_read(Post))
+
+        request = Client().get('/').wsgi_request
+        db_router.replica_reads(view)(request)
+        self.assertEqual(seen, [ALIAS, 'default'])
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_anonymous_page_cache_is_filled_from_primary(self):
+        """Кеш страниц собирается из основной базы и не устаревает."""
+        self.assertContains(self.guest_client.get(reverse('posts:index')),
+                            'Пост только в основной')
+
+    def test_etag_changes_when_replica_is_refreshed(self):
+        """Время обновления реплики входит в ETag."""
+        url = self.detail(self.old_post)
+        etag = self.reader_client.get(url)['ETag']
+        self.refresh_replica()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
@@ -0,0 +1,107 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import SEARCH_TABLE, match_expression
+
+
+User = get_user_model()
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Создаем посты с разной релевантностью к слову "котики"."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='search_author')
+        cls.admin = User.objects.create_superuser(
+            username='search_admin', email='admin@test.com',
+            password='qwerty1234')
+        cls.best = Post.objects.create(
+            author=cls.author, text='котики котики котики')
+        cls.good = Post.objects.create(
+            author=cls.author,
+            text='котики и еще много других слов про собак и попугаев')
+        cls.other = Post.objects.create(author=cls.author, text='собаки')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.search_url = reverse('posts:search')
+
+    def found(self, query, **params):
+        response = self.guest_client.get(self.search_url,
+                                         {'q': query, **params})
+        return list(response.context['page_obj'])
+
+    def test_search_ranks_results(self):
+        """Поиск находит посты по слову и сортирует по релевантности."""
+        self.assertEqual(self.found('котики'), [self.best, self.good])
+        self.assertEqual(self.found('кот'), [self.best, self.good])
+        self.assertEqual(self.found(''), [])
+
+    def test_search_ignores_fts_syntax(self):
+        """Синтаксис FTS5 в запросе не ломает поиск."""
+        self.assertEqual(match_expression('NOT "котики* OR'),
+                         '"NOT" "котики" "OR"*')
+        self.assertEqual(self.found('котики) OR (собаки'), [])
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        other = Post.objects.get(pk=self.other.pk)
+        other.text = 'теперь тут котики'
+        other.save()
+        self.assertIn(other, self.found('котики'))
+        self.assertEqual(self.found('собаки'), [])
+
+        Post.objects.filter(pk=self.best.pk).delete()
+        self.assertNotIn(self.best, self.found('котики'))
+
+    def test_search_cursor_pagination(self):
+        """Курсоры проходят все найденные посты без повторов."""
+        Post.objects.bulk_create(
+            [Post(author=self.author, text=f'котики {number}')
+             for number in range(settings.POSTS_PER_PAGE + 3)])
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            response = self.guest_client.get(
+                self.search_url, {'q': 'котики', 'cursor': cursor})
+            page_obj = response.context['page_obj']
+            seen.extend(post.id for post in page_obj)
+            cursor = page_obj.next_cursor
+        self.assertEqual(len(seen), settings.POSTS_PER_PAGE + 5)
+        self.assertEqual(len(set(seen)), len(seen))
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет по полнотекстовому индексу."""
+        client = Client()
+        client.force_login(self.admin)
+
+        response = client.get(reverse('admin:posts_post_changelist'),
+                              {'q': 'котики'})
+
+        self.assertEqual(set(response.context['cl'].result_list),
+                         {self.best, self.good})
+
+    def test_rebuild_search_index(self):
+        """rebuild_search_index заново заполняет очищенный индекс."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) "
+                           f"VALUES ('delete-all')")
+        self.assertEqual(self.found('котики'), [])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(self.found('котики'), [self.best, self.good])
+        with connection.cursor() as cursor:
+            # Индекс совпадает с posts_post, иначе -- OperationalError.
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) "
+                           f"VALUES ('integrity-check', 1)")
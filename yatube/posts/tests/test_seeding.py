@@ -0,0 +1,46 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+
+from posts.models import Post, PostCounter
+
+
+class SeedPostsCommandTests(TestCase):
+    def seed(self, prefix, seed=0):
+        call_command(
+            'seed_posts', '--users=20', '--groups=5', '--posts=500',
+            '--batch-size=128', f'--prefix={prefix}', f'--seed={seed}',
+            stdout=StringIO())
+        return Post.objects.filter(author__username__startswith=prefix)
+
+    def test_creates_requested_rows_with_counters(self):
+        """Команда создает нужное число постов и счетчики авторов."""
+        posts = self.seed('a')
+        self.assertEqual(posts.count(), 500)
+        counters = dict(PostCounter.objects.values_list(
+            'author_id', 'posts_count'))
+        actual = dict(posts.order_by().values_list('author_id')
+                      .annotate(count=Count('id')))
+        self.assertEqual({author: counters[author] for author in actual},
+                         actual)
+
+    def test_same_seed_gives_same_data(self):
+        """Одинаковый seed дает одинаковые тексты, другой -- другие."""
+        first = list(self.seed('a').order_by('id').values_list(
+            'text', flat=True))
+        second = list(self.seed('b').order_by('id').values_list(
+            'text', flat=True))
+        third = list(self.seed('c', seed=1).order_by('id').values_list(
+            'text', flat=True))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, third)
+
+    def test_posts_per_author_are_skewed(self):
+        """Посты по авторам распределены неравномерно."""
+        counts = sorted(
+            self.seed('a').order_by().values_list('author_id')
+            .annotate(count=Count('id')).values_list('count', flat=True),
+            reverse=True)
+        self.assertGreater(counts[0], 4 * counts[len(counts) // 2])
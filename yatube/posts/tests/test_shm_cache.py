@@ -0,0 +1,164 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from hashlib import md5
+
+from django.test import SimpleTestCase
+
+from core import shm_cache
+from core.shm_cache import HEADER, Region, SharedMemoryCache
+
+PARAMS = {'OPTIONS': {'MAX_ENTRIES': 64, 'SLOT_SIZE': 4096, 'WAYS': 4,
+                      'STRIPES': 4}}
+
+
+def payload(number):
+    text = md5(str(number).encode()).hexdigest() * random.randint(1, 40)
+    return {'number': number, 'text': text,
+            'check': md5(text.encode()).hexdigest()}
+
+
+def write_values(path, rounds):
+    cache = SharedMemoryCache(path, PARAMS)
+    for number in range(rounds):
+        cache.set(f'key{number % 8}', payload(number))
+
+
+def read_values(path, rounds):
+    """Код выхода 1, если прочитано рваное значение."""
+    cache = SharedMemoryCache(path, PARAMS)
+    for number in range(rounds):
+        value = cache.get(f'key{number % 8}')
+        if value is not None and (
+                md5(value['text'].encode()).hexdigest() != value['check']):
+            os._exit(1)
+    os._exit(0)
+
+
+def add_lock(path, start):
+    while time.time() < start:
+        time.sleep(0.001)
+    os._exit(0 if SharedMemoryCache(path, PARAMS).add('lock', 1) else 1)
+
+
+def increment(path, times):
+    cache = SharedMemoryCache(path, PARAMS)
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SharedMemoryCacheTests(SimpleTestCase):
+    """Кеш в файле mmap, общий для процессов."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'cache')
+        self.cache = SharedMemoryCache(self.path, PARAMS)
+
+    def run_processes(self, targets):
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=target, args=args)
+                     for target, args in targets]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+        return [process.exitcode for process in processes]
+
+    def test_cache_api(self):
+        """Обычная семантика кеша Django."""
+        cache = self.cache
+        cache.set('a', {'value': 1})
+        cache.set_many({'b': 2, 'c': None})
+        self.assertEqual(cache.get_many(['a', 'b', 'c', 'd']),
+                         {'a': {'value': 1}, 'b': 2, 'c': None})
+        self.assertFalse(cache.add('b', 3))
+        self.assertTrue(cache.add('d', 4))
+        self.assertEqual(cache.incr('b', 10), 12)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.delete('a')
+        self.assertFalse(cache.has_key('a'))
+
+        cache.set('short', 1, 0.05)
+        time.sleep(0.1)
+        self.assertEqual(cache.get('short', 'expired'), 'expired')
+        self.assertTrue(cache.add('short', 2))
+        self.assertTrue(cache.touch('b', None))
+        cache.clear()
+        self.assertEqual(cache.get_many(['b', 'd']), {})
+
+    def test_large_values(self):
+        """Сжимаемая страница помещается в слот, несжимаемое большое
+        значение не кешируется и убирает старое."""
+        page = '<li>Пост</li>' * 1000
+        self.cache.set('page', page)
+        self.assertEqual(self.cache.get('page'), page)
+        self.cache.set('page', os.urandom(8192))
+        self.assertIsNone(self.cache.get('page'))
+
+    def test_clock_keeps_recently_used(self):
+        """Вытесняется слот без недавних обращений."""
+        cache = SharedMemoryCache(self.path + '-set', {
+            'OPTIONS': {'MAX_ENTRIES': 4, 'WAYS': 4, 'STRIPES': 1}})
+        for key in 'abcd':
+            cache.set(key, key)
+        cache.get('a')
+        cache.set('e', 'e')
+        self.assertEqual(cache.get_many(list('abcde')),
+                         {'a': 'a', 'c': 'c', 'd': 'd', 'e': 'e'})
+
+    def test_concurrent_readers_see_whole_values(self):
+        """Читатели без блокировок не видят наполовину записанных
+        значений."""
+        targets = ([(write_values, (self.path, 2000))] * 4
+                   + [(read_values, (self.path, 4000))] * 4)
+        self.assertEqual(self.run_processes(targets), [0] * 8)
+        self.assertEqual(self.cache.get('key7')['number'] % 8, 7)
+
+    def test_locked_reads_see_whole_values(self):
+        """Вне x86 чтение идет под блокировкой и тоже не рвется."""
+        self.addCleanup(setattr, shm_cache, 'LOCK_FREE_READS',
+                        shm_cache.LOCK_FREE_READS)
+        shm_cache.LOCK_FREE_READS = False
+        self.test_concurrent_readers_see_whole_values()
+
+    def test_other_sizes_use_other_file(self):
+        """Кеш с другими размерами не трогает файл работающего."""
+        self.cache.set('page', 'old layout')
+        other = SharedMemoryCache(self.path, {'OPTIONS': {
+            'MAX_ENTRIES': 128, 'SLOT_SIZE': 8192, 'WAYS': 4,
+            'STRIPES': 4}})
+        other.set('page', 'new layout')
+        self.assertEqual(self.cache.get('page'), 'old layout')
+        self.assertEqual(other.get('page'), 'new layout')
+
+    def test_foreign_file_is_replaced_not_truncated(self):
+        """Файл чужого формата подменяется новым, отображение старого
+        остается целым."""
+        region = Region(self.path, 4096, 16, 4, 4)
+        self.addCleanup(os.close, region.fd)
+        self.addCleanup(region.memory.close)
+        region.memory[-1] = 7
+        os.pwrite(region.fd, b'X' * HEADER.size, 0)
+        fresh = Region(self.path, 4096, 16, 4, 4)
+        self.addCleanup(os.close, fresh.fd)
+        self.addCleanup(fresh.memory.close)
+        self.assertEqual(region.memory[-1], 7)
+        self.assertEqual(fresh.memory[-1], 0)
+        self.assertFalse(os.path.samestat(os.fstat(region.fd),
+                                          os.fstat(fresh.fd)))
+
+    def test_add_and_incr_are_atomic_across_processes(self):
+        """add берет блокировку в одном процессе, incr не теряет шагов."""
+        start = time.time() + 0.2
+        exit_codes = self.run_processes([(add_lock, (self.path, start))] * 6)
+        self.assertEqual(sorted(exit_codes), [0] + [1] * 5)
+
+        self.cache.set('counter', 0)
+        self.run_processes([(increment, (self.path, 100))] * 4)
+        self.assertEqual(self.cache.get('counter'), 400)
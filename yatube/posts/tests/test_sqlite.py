@@ -0,0 +1,150 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.db import connections, transaction
+from django.test import SimpleTestCase
+
+ALIAS = 'sqlite_concurrency'
+
+
+class SQLiteProductionTests(SimpleTestCase):
+    """Файловая база с настройками продакшена, отдельно от тестовой."""
+    writers = 4
+    readers = 4
+    rows_per_writer = 50
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'db.sqlite3')
+        connections.databases[ALIAS] = {
+            **connections.databases['default'],
+            'NAME': self.path,
+            'TEST': {},
+        }
+        self.addCleanup(connections.databases.pop, ALIAS)
+        self.addCleanup(self.close_connection)
+        self.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, value TEXT)')
+
+    def close_connection(self):
+        connections[ALIAS].close()
+        del connections[ALIAS]
+
+    def execute(self, sql, params=()):
+        with connections[ALIAS].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def in_thread(self, target, errors):
+        def run():
+            try:
+                target()
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections[ALIAS].close()
+        return threading.Thread(target=run)
+
+    def test_pragmas_are_applied(self):
+        """Новое соединение работает в WAL с настроенными прагмами."""
+        self.assertEqual(self.execute('PRAGMA journal_mode'), [('wal',)])
+        self.assertEqual(self.execute('PRAGMA synchronous'), [(1,)])
+        self.assertEqual(self.execute('PRAGMA cache_size'), [(-64000,)])
+
+    def test_writer_commits_while_reader_holds_snapshot(self):
+        """Открытая читающая транзакция не мешает записи."""
+        reading = threading.Event()
+        written = threading.Event()
+        seen = []
+        errors = []
+
+        def reader():
+            self.execute('BEGIN')
+            seen.append(self.execute('SELECT COUNT(*) FROM item')[0][0])
+            reading.set()
+            written.wait(5)
+            seen.append(self.execute('SELECT COUNT(*) FROM item')[0][0])
+            self.execute('COMMIT')
+            seen.append(self.execute('SELECT COUNT(*) FROM item')[0][0])
+
+        def writer():
+            reading.wait(5)
+            started = time.monotonic()
+            with transaction.atomic(using=ALIAS):
+                self.execute("INSERT INTO item (value) VALUES ('a')")
+            seen.append(time.monotonic() - started)
+            written.set()
+
+        threads = [self.in_thread(reader, errors),
+                   self.in_thread(writer, errors)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        first, write_time, snapshot, after = seen
+        self.assertLess(write_time, 1)
+        self.assertEqual((first, snapshot, after), (0, 0, 1))
+
+    def test_readers_and_writers_progress_together(self):
+        """Под одновременной записью читатели видят промежуточные
+        состояния, а писатели не получают "database is locked"."""
+        errors = []
+        observed = set()
+        total = self.writers * self.rows_per_writer
+        seen_intermediate = threading.Event()
+        done = threading.Event()
+
+        def writer():
+            for number in range(self.rows_per_writer):
+                with transaction.atomic(using=ALIAS):
+                    self.execute('INSERT INTO item (value) VALUES (%s)',
+                                 [str(number)])
+                # После первого коммита ждем, пока читатель увидит
+                # незаконченную запись: от планировщика потоков тест
+                # не зависит.
+                if number == 0 and not seen_intermediate.wait(10):
+                    raise AssertionError('читатели не видят записей')
+
+        def reader():
+            while not done.is_set():
+                count = self.execute('SELECT COUNT(*) FROM item')[0][0]
+                observed.add(count)
+                if 0 < count < total:
+                    seen_intermediate.set()
+
+        readers = [self.in_thread(reader, errors)
+                   for _ in range(self.readers)]
+        writers = [self.in_thread(writer, errors)
+                   for _ in range(self.writers)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        done.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.execute('SELECT COUNT(*) FROM item'),
+                         [(total,)])
+        self.assertTrue({count for count in observed if 0 < count < total})
+
+    def test_replaced_database_file_reconnects(self):
+        """Соединение с подмененным файлом базы закрывается проверкой."""
+        self.execute("INSERT INTO item (value) VALUES ('old')")
+        connection = connections[ALIAS]
+        connection.close_if_unusable_or_obsolete()
+        self.assertIsNotNone(connection.connection)
+
+        copy = self.path + '.copy'
+        self.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        shutil.copy(self.path, copy)
+        os.replace(copy, self.path)
+        connection.close_if_unusable_or_obsolete()
+        self.assertIsNone(connection.connection)
+        self.assertEqual(self.execute('SELECT value FROM item'), [('old',)])
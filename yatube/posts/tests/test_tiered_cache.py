@@ -0,0 +1,152 @@
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from core.test_runner import isolated_caches
+from core.tiered_cache import TieredCache, _tiers
+
+PARAMS = {'OPTIONS': {'L1_MAX_ENTRIES': 3, 'L1_POLL_INTERVAL': 0}}
+
+
+def in_process(target, *args):
+    """Запускает target в отдельном процессе (fork) и ждет его."""
+    process = multiprocessing.get_context('fork').Process(
+        target=target, args=args)
+    process.start()
+    process.join(10)
+    return process.exitcode
+
+
+def set_key(path, key, value):
+    TieredCache(path, PARAMS).set(key, value)
+
+
+def add_lock(path):
+    os._exit(0 if TieredCache(path, PARAMS).add('lock', 1) else 1)
+
+
+def increment(path, times):
+    cache = TieredCache(path, PARAMS)
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class TieredCacheTests(SimpleTestCase):
+    """L1 в процессе и общий L2 в файле SQLite."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'cache.sqlite3')
+        self.addCleanup(_tiers.pop, self.path, None)
+        self.cache = TieredCache(self.path, PARAMS)
+
+    def l2_keys(self):
+        with sqlite3.connect(self.path) as connection:
+            return {key for key, in connection.execute(
+                'SELECT key FROM cache_entry')}
+
+    def test_cache_api(self):
+        """Обычная семантика кеша Django."""
+        cache = self.cache
+        cache.set('a', {'value': 1})
+        cache.set_many({'b': 2, 'c': None})
+        self.assertEqual(cache.get('a'), {'value': 1})
+        self.assertEqual(cache.get_many(['a', 'b', 'c', 'd']),
+                         {'a': {'value': 1}, 'b': 2, 'c': None})
+        self.assertFalse(cache.add('b', 3))
+        self.assertTrue(cache.add('d', 4))
+        self.assertEqual(cache.incr('b', 10), 12)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.delete('a')
+        self.assertIsNone(cache.get('a'))
+        self.assertFalse(cache.has_key('a'))
+
+        cache.set('short', 1, 0.05)
+        time.sleep(0.1)
+        self.assertEqual(cache.get('short', 'expired'), 'expired')
+        self.assertTrue(cache.add('short', 2))
+        cache.set('zero', 1, 0)
+        self.assertFalse(cache.has_key('zero'))
+        self.assertTrue(cache.touch('b', None))
+
+        cache.clear()
+        self.assertEqual(cache.get_many(['b', 'd']), {})
+
+    def test_l1_is_bounded_lru_before_l2(self):
+        """L1 отдает ключ без L2 и держит не больше L1_MAX_ENTRIES."""
+        tier = _tiers[self.path]
+        for key in 'abcd':
+            self.cache.set(key, key)
+        self.assertEqual(list(tier.entries), [':1:b', ':1:c', ':1:d'])
+        self.assertEqual(self.cache.get('a'), 'a')
+
+        with sqlite3.connect(self.path) as connection:
+            connection.execute('DELETE FROM cache_entry')
+        self.assertEqual(self.cache.get('a'), 'a')
+        self.assertIsNone(self.cache.get('b'))
+
+    def test_other_process_write_evicts_l1(self):
+        """Запись другого процесса выбрасывает ключ из L1."""
+        self.cache.set('feed', 'old')
+        self.assertEqual(self.cache.get('feed'), 'old')
+        self.assertEqual(in_process(set_key, self.path, 'feed', 'new'), 0)
+        self.assertEqual(self.cache.get('feed'), 'new')
+        self.assertIn(':1:feed', self.l2_keys())
+
+    def test_add_and_incr_are_atomic_across_processes(self):
+        """Блокировку add получает один процесс, incr не теряет шагов."""
+        self.assertTrue(self.cache.add('lock', 1))
+        self.assertEqual(in_process(add_lock, self.path), 1)
+        self.cache.delete('lock')
+        self.assertEqual(in_process(add_lock, self.path), 0)
+
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=increment, args=(self.path, 50))
+                     for _ in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_lagging_process_clears_l1(self):
+        """Отставший от журнала процесс очищает L1 целиком."""
+        self.cache.set('a', 1)
+        tier = _tiers[self.path]
+        tier.last_id -= 10
+        self.cache.get('b')
+        self.assertEqual(len(tier.entries), 0)
+        self.assertEqual(self.cache.get('a'), 1)
+
+    def test_test_run_uses_own_cache_files(self):
+        """Тесты пишут не в файлы кешей сервера на той же машине."""
+        for alias in settings.CACHES:
+            with self.subTest(alias=alias):
+                location = settings.CACHES[alias].get('LOCATION', '')
+                self.assertTrue(os.path.basename(
+                    os.path.dirname(location)).startswith(
+                        'yatube-test-cache-'))
+
+    def test_isolated_caches_do_not_leak(self):
+        """Записи из isolated_caches не видны в кешах после блока."""
+        before = {alias: config['LOCATION']
+                  for alias, config in settings.CACHES.items()}
+        with isolated_caches() as directory:
+            for alias in settings.CACHES:
+                caches[alias].set('isolated', alias)
+        self.assertFalse(os.path.exists(directory))
+        for alias in settings.CACHES:
+            with self.subTest(alias=alias):
+                self.assertEqual(settings.CACHES[alias]['LOCATION'],
+                                 before[alias])
+                self.assertIsNone(caches[alias].get('isolated'))
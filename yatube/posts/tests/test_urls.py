@@ -1,6 +1,7 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase, Client
 
 from posts.models import Group, Post
@@ -45,6 +46,7 @@ class PostURLTest(TestCase):
         """Создаем неавторизованный клиент, cоздаем авторизованный клиент
         и авторизованный клиент автора поста
         и авторизуем пользователей."""
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.not_author)
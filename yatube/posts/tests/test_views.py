@@ -5,9 +5,11 @@ from django.urls import reverse
 from django.test import TestCase, Client
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 
 from posts.models import Post, Group
-from posts.tests.utils import page_obj_func
+from posts.tests.utils import page_obj_func, slow_plan_steps
+from posts.utils import keyset_filter, keyset_ordering
 
 User = get_user_model()
 
@@ -46,6 +48,7 @@ class PostPagesTests(TestCase):
     def setUp(self):
         """Создаем неавторизованный клиент, cоздаем авторизованный клиент
         и авторизуем пользователя и словарь шаблонов."""
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.post_author)
@@ -76,6 +79,21 @@ class PostPagesTests(TestCase):
                 self.assertTemplateUsed(response, template)
                 self.assertEqual(response.status_code, HTTPStatus.OK.value)
 
+    def test_feed_views_query_count(self):
+        """Ленты не делают запросов на каждый пост (нет N+1):
+        index -- COUNT и страница, group_posts -- еще группа,
+        profile -- еще автор и счетчик постов."""
+        feed_queries = {
+            reverse(self.index_v): 2,
+            reverse(self.group_posts_v, kwargs={'slug': self.group.slug}): 3,
+            reverse(self.profile_v, kwargs={
+                'username': self.post_author.username}): 4,
+        }
+        for address, queries in feed_queries.items():
+            with self.subTest(address=address):
+                with self.assertNumQueries(queries):
+                    self.guest_client.get(address)
+
     def test_posts_index_get_correct_context(self):
         """Шаблоны index сформированы с верным контекстом."""
         page_obj = page_obj_func(Post.objects.all(), 1)
@@ -240,3 +258,79 @@ class PostPagesTests(TestCase):
         for template, reverse_name in namespace_list.items():
             response = self.guest_client.get(reverse_name)
             self.assertEqual(len(response.context['page_obj']), count_posts)
+
+
+class FeedQueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='plan_author')
+        cls.group = Group.objects.create(
+            title='plan group',
+            slug='plan-group',
+            description='plan group description',
+        )
+        cls.post = Post.objects.create(
+            text='plan post', author=cls.author, group=cls.group)
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент index, group_posts и profile идут по индексам:
+        без полного просмотра таблицы и без сортировки во временном
+        B-дереве."""
+        per_page = settings.POSTS_PER_PAGE
+        feeds = {
+            'index': Post.objects.for_feed(),
+            'group_posts': self.group.posts.for_feed(),
+            'profile': self.author.posts.for_feed(),
+        }
+        for name, queryset in feeds.items():
+            ordering = keyset_ordering(queryset)
+            after_post = queryset.filter(keyset_filter(
+                ordering, [self.post.pub_date, self.post.id]))
+            pages = {
+                'first': queryset[:per_page],
+                'offset': queryset[per_page:per_page * 2],
+                'cursor': after_post.order_by(*ordering)[:per_page + 1],
+            }
+            for page, page_queryset in pages.items():
+                with self.subTest(feed=name, page=page):
+                    self.assertEqual(slow_plan_steps(page_queryset), [])
+
+
+class FeedExcerptTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Создаем длинный пост, который в лентах виден анонсом."""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='excerpt_author')
+        cls.group = Group.objects.create(
+            title='excerpt group',
+            slug='excerpt-group',
+            description='excerpt group description',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group,
+            text='начало ' + 'слово ' * 100 + 'хвост')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_feeds_render_excerpt_without_loading_text(self):
+        """Ленты показывают анонс и не читают полный текст."""
+        self.assertNotIn('"posts_post"."text"',
+                         str(Post.objects.for_feed().query))
+        feeds = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}),
+        )
+        for url in feeds:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'начало')
+                self.assertNotContains(response, 'хвост')
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
+        self.assertContains(response, 'хвост')
@@ -1,5 +1,8 @@
+from contextlib import contextmanager
+
 from django.core.paginator import Paginator
 from django.conf import settings
+from django.db import connections
 
 
 def page_obj_func(queryset, number):
@@ -10,3 +13,37 @@ def page_obj_func(queryset, number):
     page_number = number
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def query_plan(queryset):
+    """Шаги EXPLAIN QUERY PLAN (SQLite) для запроса queryset."""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def slow_plan_steps(queryset):
+    """Шаги плана с полным просмотром таблицы или сортировкой во
+    временном B-дереве."""
+    return [
+        step for step in query_plan(queryset)
+        if 'TEMP B-TREE' in step
+        or (step.startswith('SCAN ') and ' USING ' not in step)
+    ]
+
+
+@contextmanager
+def commit_callbacks(using='default'):
+    """Выполняет transaction.on_commit, отложенные внутри блока.
+
+    TestCase не фиксирует свою транзакцию, и такие колбэки иначе не
+    вызываются (в Django 3.2 -- captureOnCommitCallbacks(execute=True)).
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    yield
+    callbacks = connection.run_on_commit[start:]
+    del connection.run_on_commit[start:]
+    for _, callback in callbacks:
+        callback()
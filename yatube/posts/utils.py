@@ -1,9 +1,215 @@
-from django.core.paginator import Paginator
+import base64
+import json
+import math
+
 from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+class PostPage(Page):
+    @property
+    def elided_page_range(self):
+        return list(self.paginator.get_elided_page_range(self.number))
+
+
+class PostPaginator(Paginator):
+    """Paginator с сокращенным списком страниц (как в Django 3.2)."""
+    ELLIPSIS = '…'
+
+    def _get_page(self, *args, **kwargs):
+        return PostPage(*args, **kwargs)
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """Первые и последние страницы, соседи текущей и многоточия."""
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > (1 + on_each_side + on_ends) + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < (self.num_pages - on_each_side - on_ends) - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1,
+                             self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
 
 
 def post_paginator(queryset, request):
-    paginator = Paginator(queryset, settings.POSTS_PER_PAGE)
+    if 'cursor' in request.GET or settings.POSTS_PAGINATION == 'cursor':
+        return cursor_paginator(queryset, request.GET.get('cursor'))
+    paginator = PostPaginator(queryset, settings.POSTS_PER_PAGE)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает список значений курсора или None для битого курсора."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw.decode())
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def keyset_ordering(queryset):
+    """Поля сортировки queryset с pk в конце для однозначности ключа."""
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+    names = [field.lstrip('-') for field in ordering]
+    if 'pk' not in names and 'id' not in names:
+        direction = '-' if ordering and ordering[-1].startswith('-') else ''
+        ordering.append(direction + 'id')
+    return ordering
+
+
+def keyset_filter(ordering, values, forward=True):
+    """Условие "строго после ключа values" для сортировки ordering."""
+    condition = Q()
+    for position, field in enumerate(ordering):
+        name = field.lstrip('-')
+        descending = field.startswith('-') == forward
+        lookup = '{}__{}'.format(name, 'lt' if descending else 'gt')
+        step = Q(**{lookup: values[position]})
+        for prev_field, prev_value in zip(ordering[:position], values):
+            step &= Q(**{prev_field.lstrip('-'): prev_value})
+        condition |= step
+    return condition
+
+
+def reverse_ordering(ordering):
+    return [field[1:] if field.startswith('-') else '-' + field
+            for field in ordering]
+
+
+class CursorPage:
+    """Страница keyset-пагинации: без COUNT(*) и без OFFSET."""
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _cursor_values(obj, ordering):
+    values = []
+    for field in ordering:
+        name = field.lstrip('-')
+        # Строки values() -- словари.
+        value = obj[name] if isinstance(obj, dict) else getattr(obj, name)
+        values.append(value.isoformat() if hasattr(value, 'isoformat')
+                      else value)
+    return values
+
+
+def _parse_cursor_value(queryset, name, value):
+    """Значение ключа типа поля name; ValueError, если курсор подделан."""
+    try:
+        model_field = queryset.model._meta.get_field(
+            'id' if name == 'pk' else name)
+    except FieldDoesNotExist:
+        # Аннотация (например, score поиска) -- число.
+        value = float(value)
+        if not math.isfinite(value):
+            raise ValueError(value)
+        return value
+    if model_field.get_internal_type() == 'DateTimeField':
+        value = parse_datetime(value) if isinstance(value, str) else None
+        if (value is not None and settings.USE_TZ
+                and timezone.is_naive(value)):
+            value = timezone.make_aware(value, is_dst=False)
+    else:
+        try:
+            value = model_field.to_python(value)
+        except ValidationError as error:
+            raise ValueError(value) from error
+    if value is None or (isinstance(value, int)
+                         and not -2 ** 63 <= value < 2 ** 63):
+        # Целые за пределами INTEGER SQLite падают в запросе.
+        raise ValueError(value)
+    return value
+
+
+def _parse_cursor_values(queryset, ordering, values):
+    try:
+        return [_parse_cursor_value(queryset, field.lstrip('-'), value)
+                for field, value in zip(ordering, values)]
+    except (TypeError, ValueError):
+        return None
+
+
+def cursor_paginator(queryset, cursor, per_page=None):
+    """Keyset-пагинация по сортировке модели (для Post -- pub_date, id).
+
+    Курсор непрозрачный: направление и значения ключа последней
+    (или первой) записи страницы.
+    """
+    per_page = per_page or settings.POSTS_PER_PAGE
+    ordering = keyset_ordering(queryset)
+    values = decode_cursor(cursor) if cursor else None
+    forward = True
+    if (values and len(values) == len(ordering) + 1
+            and values[0] in ('n', 'p')):
+        forward = values[0] == 'n'
+        values = _parse_cursor_values(queryset, ordering, values[1:])
+    else:
+        values = None
+
+    if values is None:
+        page = queryset.order_by(*ordering)
+    elif forward:
+        page = queryset.filter(
+            keyset_filter(ordering, values)).order_by(*ordering)
+    else:
+        page = queryset.filter(
+            keyset_filter(ordering, values, forward=False)).order_by(
+                *reverse_ordering(ordering))
+    object_list = list(page[:per_page + 1])
+    has_more = len(object_list) > per_page
+    object_list = object_list[:per_page]
+    if not forward:
+        object_list.reverse()
+
+    next_cursor = previous_cursor = None
+    if object_list:
+        if has_more or not forward:
+            next_cursor = encode_cursor(
+                ['n'] + _cursor_values(object_list[-1], ordering))
+        if values is not None and (forward or has_more):
+            previous_cursor = encode_cursor(
+                ['p'] + _cursor_values(object_list[0], ordering))
+    return CursorPage(object_list, next_cursor, previous_cursor)
@@ -0,0 +1,38 @@
+import time
+
+from django.core.cache import cache
+
+# Метки версий в кеше: время последнего изменения объекта. Входят в ключи
+# закешированных фрагментов, поэтому смена метки делает старые записи
+# недостижимыми без явного удаления.
+
+
+def post_key(post_id):
+    return f'version:post:{post_id}'
+
+
+def author_key(author_id):
+    return f'version:author:{author_id}'
+
+
+def group_key(group_id):
+    return f'version:group:{group_id}'
+
+
+def feed_key(feed, *args):
+    return ':'.join(['version:feed', feed, *map(str, args)])
+
+
+def get_versions(keys):
+    """Метки по ключам; отсутствующие в кеше заводятся текущим временем."""
+    versions = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return versions
+
+
+def bump(*keys):
+    now = time.time()
+    cache.set_many({key: now for key in keys}, None)
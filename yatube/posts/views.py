@@ -1,10 +1,20 @@
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 
+from core.db_router import replica_reads
+
+from . import export
+from .batching import save_post
+from .conditional import conditional_page, feed_validators, post_validators
 from .forms import PostForm
-from .models import Group, Post
-from .utils import post_paginator
+from .lookups import get_author_or_404, get_group_or_404
+from .models import Post, PostCounter
+from .page_cache import cache_anonymous_page
+from .search import search as search_posts
+from .utils import cursor_paginator, post_paginator
 
 User = get_user_model()
 
@@ -16,7 +26,7 @@ def post_create(request):
         if form.is_valid():
             form = form.save(commit=False)
             form.author = request.user
-            form.save()
+            save_post(form)
             return redirect('posts:profile', username=form.author.username)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -38,9 +48,11 @@ def post_edit(request, post_id):
                   context)
 
 
+@replica_reads
+@conditional_page(post_validators)
 def post_detail(request, post_id):
     post = get_object_or_404(Post, id=post_id)
-    count_post = Post.objects.filter(author=post.author_id).count()
+    count_post = PostCounter.objects.posts_count(post.author_id)
     context = {
         'post': post,
         'count_post': count_post,
@@ -48,17 +60,23 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@replica_reads
+@conditional_page(feed_validators('index'))
+@cache_anonymous_page('index')
 def index(request):
-    page_obj = post_paginator(Post.objects.all(), request)
+    page_obj = post_paginator(Post.objects.for_feed(), request)
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@conditional_page(feed_validators('group_posts'))
+@cache_anonymous_page('group_posts')
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    page_obj = post_paginator(group.posts.all(), request)
+    group = get_group_or_404(slug)
+    page_obj = post_paginator(group.posts.for_feed(), request)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -66,13 +84,50 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@conditional_page(feed_validators('profile'))
+@cache_anonymous_page('profile')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    count_post = author.posts.all().count()
-    page_obj = post_paginator(author.posts.all(), request)
+    author = get_author_or_404(username)
+    count_post = PostCounter.objects.posts_count(author.pk)
+    page_obj = post_paginator(author.posts.for_feed(), request)
     context = {
         'author': author,
         'count_post': count_post,
         'page_obj': page_obj,
     }
     return render(request, 'posts/profile.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = cursor_paginator(
+        search_posts(Post.objects.for_feed(), query),
+        request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    export_format = request.GET.get('format', 'jsonl')
+    if export_format not in export.FORMATS:
+        return HttpResponseBadRequest('Неизвестный формат выгрузки.')
+    try:
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        return HttpResponseBadRequest('after должен быть id поста.')
+    rows = export.export_rows(author.posts.all(), after=after)
+    response = StreamingHttpResponse(
+        # Продолжение дописывается к уже полученному файлу: без заголовка.
+        export.export_lines(rows, export_format, header=not after),
+        content_type=export.FORMATS[export_format])
+    response['Content-Disposition'] = (
+        f'attachment; filename="{author.username}-posts.{export_format}"')
+    return response
@@ -1,4 +1,6 @@
 import os
+import tempfile
+from hashlib import md5
 
 
 LOGIN_URL = 'users:login'
@@ -13,6 +15,97 @@ DEBUG = True
 
 POSTS_PER_PAGE = 10
 
+# 'page' -- ?page=N с COUNT(*), 'cursor' -- keyset-пагинация по ?cursor=
+POSTS_PAGINATION = 'page'
+
+# Кеш страниц лент для анонимных пользователей. Сбрасывается событиями
+# (создание, правка, удаление поста), таймаут лишь ограничивает хранение.
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = 60 * 60
+# Сколько секунд страница свежая; дальше ее отдают устаревшей, пока
+# один запрос пересчитывает ее под блокировкой в кеше.
+PAGE_CACHE_FRESH = 60
+PAGE_CACHE_LOCK_TIMEOUT = 10
+
+# Файлы кешей общие для всех воркеров одного развертывания. По умолчанию
+# они свои у каждой копии проекта (метка -- хеш BASE_DIR), в продакшене
+# пути задает окружение. Тесты кладут их во временный каталог прогона
+# (core/test_runner.py).
+CACHE_TAG = md5(BASE_DIR.encode()).hexdigest()[:8]
+
+# L1 в памяти каждого процесса перед общим для всех воркеров L2 в файле
+# SQLite (core/tiered_cache.py). Изменения ключей рассылаются через журнал
+# в L2 и выбрасывают их из L1 остальных процессов.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.tiered_cache.TieredCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(),
+                         f'yatube-{CACHE_TAG}-cache.sqlite3')),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'L1_MAX_ENTRIES': 5000,
+            'L1_POLL_INTERVAL': 0.05,
+        },
+    },
+    # Горячие страницы лент и объекты групп и авторов: одна копия
+    # на машину в файле mmap, общем для всех воркеров (core/shm_cache.py).
+    # Файл занимает MAX_ENTRIES * SLOT_SIZE (64 МиБ), на tmpfs -- только
+    # реально записанные страницы. К имени файла добавляются размеры.
+    'shared': {
+        'BACKEND': 'core.shm_cache.SharedMemoryCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_SHARED_CACHE_LOCATION',
+            os.path.join('/dev/shm' if os.path.isdir('/dev/shm')
+                         else tempfile.gettempdir(),
+                         f'yatube-{CACHE_TAG}-shared-cache')),
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 4096, 'SLOT_SIZE': 16384},
+    },
+}
+SHARED_CACHE_ALIAS = 'shared'
+
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Адреса, которым доступен /metrics/ (текстовый формат Prometheus).
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+# Server-Timing и гистограммы времени запросов по имени URL.
+PERFORMANCE_METRICS_ENABLED = True
+# Раз во сколько секунд воркер прибавляет свои наблюдения к гистограммам
+# в общем кеше, из которого /metrics/ отдает сумму по всем воркерам.
+METRICS_FLUSH_INTERVAL = 5
+
+# Статистика SQL по отпечаткам (manage.py top_queries) и лог медленных
+# запросов. Файлы пишутся, только если окружение задает их пути:
+# каталог статистики процессов и файл лога.
+SQL_FINGERPRINTS_ENABLED = True
+SLOW_QUERY_THRESHOLD_MS = 100
+SQL_STATS_DIR = os.environ.get('YATUBE_SQL_STATS_DIR')
+SQL_STATS_FLUSH_INTERVAL = 10
+SLOW_QUERY_LOG = os.environ.get('YATUBE_SLOW_QUERY_LOG')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.FileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'delay': True,
+        } if SLOW_QUERY_LOG else {'class': 'logging.NullHandler'},
+    },
+    'loggers': {
+        'yatube.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 ALLOWED_HOSTS = []
 
 INSTALLED_APPS = [
@@ -30,6 +123,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.SqlFingerprintMiddleware',
+    'core.db_router.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,11 +160,59 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # Обычный sqlite3 Django плюс прагмы, BEGIN IMMEDIATE и проверка
+        # постоянных соединений (core/sqlite_backend).
+        'ENGINE': 'core.sqlite_backend',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Сколько секунд ждать блокировку записи вместо
+        # "database is locked".
+        'OPTIONS': {'timeout': 20},
+        # Соединение переживает запрос и переиспользуется потоком.
+        'CONN_MAX_AGE': 600,
     }
 }
 
+# Прагмы каждого нового соединения с файловой базой SQLite.
+SQLITE_PRAGMAS = {
+    # Читатели не блокируют писателя и наоборот.
+    'journal_mode': 'WAL',
+    # В WAL безопасно: при сбое питания теряется лишь последний коммит.
+    'synchronous': 'NORMAL',
+    # Отрицательное значение -- размер кеша страниц в КиБ (64 МиБ).
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Проверять постоянное соединение в начале и конце каждого запроса.
+DATABASE_HEALTH_CHECKS = True
+
+# Реплики только для чтения -- алиасы DATABASES. Ленты и страница поста
+# читают с них, запись и все остальное идут в default (core/db_router).
+# Например, локальная копия, которую обновляет manage.py refresh_replicas:
+#
+# DATABASES['replica'] = {
+#     **DATABASES['default'],
+#     'NAME': os.path.join(BASE_DIR, 'db-replica.sqlite3'),
+#     'PRAGMAS': {**SQLITE_PRAGMAS, 'journal_mode': 'DELETE',
+#                 'query_only': 'ON'},
+#     'TEST': {'MIRROR': 'default'},
+# }
+# DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# Сколько секунд после записи пользователь читает только основную базу;
+# должно быть больше отставания реплик.
+REPLICA_PIN_SECONDS = 10
+REPLICA_PIN_COOKIE = 'primary_reads'
+
+# Групповая запись новых постов (posts/batching.py): post_create ставит
+# пост в очередь, фоновый поток сохраняет очередь одной транзакцией.
+POST_BATCH_ENABLED = False
+# Сколько секунд первый пост пачки ждет остальных.
+POST_BATCH_WINDOW = 0.01
+POST_BATCH_SIZE = 50
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {